@@ -1,31 +1,126 @@
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from services.cache import CacheEntry, LRUCache
 
 st.set_page_config(page_title="skillpathAI – Personalized 7-Day Learning Path", layout="centered")
 
 API_BASE_URL = "http://127.0.0.1:8000"
 
-def generate_plan(topic):
-    response = requests.post(f"{API_BASE_URL}/generate_plan", json={"topic": topic})
-    response.raise_for_status()
-    return response.json()
+# Overview plans are shared across browser sessions for this many seconds
+PLAN_CACHE_TTL = float(os.getenv("FRONTEND_PLAN_CACHE_TTL", "3600"))
+PLAN_CACHE_ENTRIES = int(os.getenv("FRONTEND_PLAN_CACHE_ENTRIES", "256"))
+
+# Load the next day's details in the background while the current one is being read
+PREFETCH_NEXT_DAY = os.getenv("FRONTEND_PREFETCH_NEXT_DAY", "1") != "0"
+PREFETCH_WORKERS = int(os.getenv("FRONTEND_PREFETCH_WORKERS", "4"))
+
+@st.cache_resource
+def get_http_session():
+    """One pooled HTTP session shared by every browser session, so requests reuse keep-alive connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=PREFETCH_WORKERS + 8)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_resource
+def get_plan_cache():
+    return LRUCache(max_entries=PLAN_CACHE_ENTRIES, ttl=PLAN_CACHE_TTL)
+
+@st.cache_resource
+def get_prefetch_executor():
+    return ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="day-prefetch")
 
-def get_detailed_day(topic, day_topic, day_number):
-    response = requests.post(f"{API_BASE_URL}/get_detailed_day", json={
+def plan_cache_key(topic):
+    return " ".join(topic.lower().split())
+
+def stream_plan(topic):
+    """
+    Yield plan days one at a time from the streaming endpoint as the backend finishes them,
+    then a final {"plan_id": ...} item naming the stored plan.
+    """
+    with get_http_session().post(f"{API_BASE_URL}/generate_plan/stream", json={"topic": topic}, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            day = json.loads(line)
+            if "error" in day:
+                raise RuntimeError(day["error"])
+            yield day
+
+def render_day_summary(day):
+    st.subheader(day['day'])
+    st.write(f"**Topic:** {day['topic']}")
+    st.write(f"**Mini Challenge:** {day['mini_challenge']}")
+    st.write(f"**Reasoning:** {day['reasoning']}")
+    
+    if day.get("resources"):
+        st.write("**Recommended Resources:**")
+        for res in day["resources"]:
+            st.markdown(f"- **{res['type']}**: [{res['title']}]({res['url']})")
+
+def get_detailed_day(topic, day_topic, day_number, plan_id=None):
+    response = get_http_session().post(f"{API_BASE_URL}/get_detailed_day", json={
         "topic": topic,
         "day_topic": day_topic,
-        "day_number": day_number
+        "day_number": day_number,
+        "plan_id": plan_id
     })
     response.raise_for_status()
     return response.json()
 
+def day_number_of(day_label):
+    """Day number from a "Day N" label (1 if it has none)."""
+    if "Day" in day_label:
+        return int(day_label.split()[-1])  # Get the last part after splitting
+    return 1  # Default fallback
+
+def set_plan(topic, plan, plan_id=None):
+    """Show a new plan, dropping the detailed days loaded for the previous one."""
+    st.session_state['plan'] = plan
+    st.session_state['plan_id'] = plan_id
+    st.session_state['original_topic'] = topic
+    st.session_state['detailed_days'] = {}
+    st.session_state['day_prefetches'] = {}
+
+def load_detailed_day(topic, day_topic, day_number):
+    """Return a detailed day from this plan's cache, a finished (or running) prefetch, or the backend."""
+    detailed_days = st.session_state['detailed_days']
+    plan_id = st.session_state.get('plan_id')
+    if day_number not in detailed_days:
+        prefetch = st.session_state['day_prefetches'].pop(day_number, None)
+        try:
+            detailed_days[day_number] = prefetch.result() if prefetch else get_detailed_day(topic, day_topic, day_number, plan_id)
+        except Exception:
+            if prefetch is None:
+                raise
+            # The prefetch failed; try once more in the foreground
+            detailed_days[day_number] = get_detailed_day(topic, day_topic, day_number, plan_id)
+    return detailed_days[day_number]
+
+def prefetch_detailed_day(topic, day_topic, day_number):
+    """Start loading a detailed day in the background unless it is already loaded or loading."""
+    if day_number in st.session_state['detailed_days'] or day_number in st.session_state['day_prefetches']:
+        return
+    st.session_state['day_prefetches'][day_number] = get_prefetch_executor().submit(
+        get_detailed_day, topic, day_topic, day_number, st.session_state.get('plan_id')
+    )
+
 # Initialize session state
 if 'plan' not in st.session_state:
     st.session_state['plan'] = None
 if 'current_day' not in st.session_state:
     st.session_state['current_day'] = None
-if 'detailed_day_data' not in st.session_state:
-    st.session_state['detailed_day_data'] = None
+if 'detailed_days' not in st.session_state:
+    st.session_state['detailed_days'] = {}
+if 'day_prefetches' not in st.session_state:
+    st.session_state['day_prefetches'] = {}
 if 'original_topic' not in st.session_state:
     st.session_state['original_topic'] = None
 
@@ -33,9 +128,11 @@ if 'original_topic' not in st.session_state:
 if st.session_state['current_day']:
     # Find the day data safely
     day_data = None
-    for d in st.session_state['plan']:
+    day_index = None
+    for i, d in enumerate(st.session_state['plan']):
         if d['day'] == st.session_state['current_day']:
             day_data = d
+            day_index = i
             break
     
     if not day_data:
@@ -43,37 +140,38 @@ if st.session_state['current_day']:
         st.session_state['current_day'] = None
         st.rerun()
     
-    # Load detailed day data if not already loaded
-    if not st.session_state['detailed_day_data'] or st.session_state['detailed_day_data']['day'] != st.session_state['current_day']:
-        with st.spinner("Loading detailed learning plan..."):
-            try:
-                # Extract day number more safely
-                day_str = st.session_state['current_day']
-                if "Day" in day_str:
-                    day_number = int(day_str.split()[-1])  # Get the last part after splitting
-                else:
-                    day_number = 1  # Default fallback
-                
-
-                st.session_state['detailed_day_data'] = get_detailed_day(
-                    st.session_state['original_topic'], 
-                    day_data['topic'], 
-                    day_number
-                )
-            except Exception as e:
-                st.error(f"Failed to load detailed plan: {e}")
-                st.error(f"Debug info: current_day='{st.session_state['current_day']}', original_topic='{st.session_state.get('original_topic', 'None')}'")
-                st.session_state['current_day'] = None
-                st.rerun()
+    # Load detailed day data; days already seen in this plan come from the session cache
+    with st.spinner("Loading detailed learning plan..."):
+        try:
+            detailed_data = load_detailed_day(
+                st.session_state['original_topic'], 
+                day_data['topic'], 
+                day_number_of(st.session_state['current_day'])
+            )
+        except Exception as e:
+            st.error(f"Failed to load detailed plan: {e}")
+            st.error(f"Debug info: current_day='{st.session_state['current_day']}', original_topic='{st.session_state.get('original_topic', 'None')}'")
+            st.session_state['current_day'] = None
+            st.rerun()
     
-    detailed_data = st.session_state['detailed_day_data']
+    previous_day = st.session_state['plan'][day_index - 1] if day_index > 0 else None
+    next_day = st.session_state['plan'][day_index + 1] if day_index + 1 < len(st.session_state['plan']) else None
+    if PREFETCH_NEXT_DAY and next_day:
+        prefetch_detailed_day(st.session_state['original_topic'], next_day['topic'], day_number_of(next_day['day']))
     
     # Navigation
-    col1, col2 = st.columns([1, 4])
+    col1, col2, col3 = st.columns([2, 1, 1])
     with col1:
         if st.button("← Back to Overview"):
             st.session_state['current_day'] = None
-            st.session_state['detailed_day_data'] = None
+            st.rerun()
+    with col2:
+        if previous_day and st.button("‹ Previous day"):
+            st.session_state['current_day'] = previous_day['day']
+            st.rerun()
+    with col3:
+        if next_day and st.button("Next day ›"):
+            st.session_state['current_day'] = next_day['day']
             st.rerun()
     
     # Header
@@ -176,29 +274,37 @@ else:
     topic = st.text_input("Enter a learning topic:", placeholder="e.g., Python for Data Analysis")
 
     if st.button("Generate 7-Day Learning Plan"):
+        cached_plan = get_plan_cache().get(plan_cache_key(topic))
         if topic.strip() == "":
             st.warning("Please enter a topic.")
+        elif cached_plan is not None:
+            # Someone asked for this topic recently: reuse their plan without a backend round trip
+            set_plan(topic, cached_plan.value["plan"], cached_plan.value["plan_id"])
+            st.rerun()
         else:
+            # Render days as they stream in, then rerun to show the interactive plan
+            streamed_days = []
+            plan_id = None
+            st.session_state['plan'] = None
             with st.spinner("Generating your personalized learning plan..."):
                 try:
-                    st.session_state['plan'] = generate_plan(topic)
-                    st.session_state['original_topic'] = topic
-                    st.success("Your learning plan is ready!")
+                    for day in stream_plan(topic):
+                        if "plan_id" in day:
+                            plan_id = day["plan_id"]
+                            continue
+                        streamed_days.append(day)
+                        render_day_summary(day)
+                        st.divider()
+                    get_plan_cache().set(plan_cache_key(topic), CacheEntry({"plan": streamed_days, "plan_id": plan_id}, time.time()))
+                    set_plan(topic, streamed_days, plan_id)
+                    st.rerun()
                 except Exception as e:
                     st.error(f"Failed to generate plan: {e}")
 
     if st.session_state['plan']:
         st.success("Click on any day to start learning!")
         for day in st.session_state['plan']:
-            st.subheader(day['day'])
-            st.write(f"**Topic:** {day['topic']}")
-            st.write(f"**Mini Challenge:** {day['mini_challenge']}")
-            st.write(f"**Reasoning:** {day['reasoning']}")
-            
-            if day.get("resources"):
-                st.write("**Recommended Resources:**")
-                for res in day["resources"]:
-                    st.markdown(f"- **{res['type']}**: [{res['title']}]({res['url']})")
+            render_day_summary(day)
             
             if st.button(f"Start Learning - {day['day']}", key=f"btn_{day['day']}"):
                 st.session_state['current_day'] = day['day']
@@ -0,0 +1,70 @@
+import time
+from typing import Optional
+from services.metrics import REQUEST_BYTES, REQUEST_SECONDS, RESPONSE_BYTES, server_timing, summarize_timings, track_request
+
+
+def route_path(scope) -> str:
+    """The matched route template (e.g. /plans/{plan_id}), so metric labels stay bounded."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and payload sizes for every request.
+
+    Adds a Server-Timing header with the per-stage breakdown collected while the
+    request ran. Streaming responses send their headers early, so their header
+    only covers the stages finished before the first byte; the histograms and
+    the slow-request log always see the whole request. Requests slower than
+    `slow_request_seconds` (when set) are printed with their stage breakdown.
+    """
+
+    def __init__(self, app, slow_request_seconds: Optional[float] = None):
+        self.app = app
+        self.slow_request_seconds = slow_request_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        sizes = {"request": 0, "response": 0}
+        status = 500
+
+        async def receive_with_size():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes["request"] += len(message.get("body", b""))
+            return message
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing(timings, time.perf_counter() - start)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode("latin-1"))]
+            elif message["type"] == "http.response.body":
+                sizes["response"] += len(message.get("body", b""))
+            await send(message)
+
+        with track_request() as timings:
+            try:
+                await self.app(scope, receive_with_size, send_with_timing)
+            finally:
+                elapsed = time.perf_counter() - start
+                path = route_path(scope)
+                REQUEST_SECONDS.observe(elapsed, scope["method"], path, str(status))
+                REQUEST_BYTES.observe(sizes["request"], path)
+                RESPONSE_BYTES.observe(sizes["response"], path)
+                if self.slow_request_seconds and elapsed >= self.slow_request_seconds:
+                    self._log_slow_request(scope, status, elapsed, timings)
+
+    @staticmethod
+    def _log_slow_request(scope, status: int, elapsed: float, timings) -> None:
+        stages = ", ".join(
+            f"{name} {total:.2f}s" + (f" x{count}" if count > 1 else "")
+            for name, (total, count) in summarize_timings(timings).items()
+        )
+        print(f"Slow request: {scope['method']} {scope['path']} {status} in {elapsed:.2f}s ({stages or 'no stages recorded'})")
@@ -0,0 +1,374 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised by submit() when the job queue is at capacity."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Job queue is full")
+        self.retry_after = retry_after
+
+
+class Job:
+    """A queued unit of work whose results arrive piece by piece."""
+
+    def __init__(self, kind: str, params: Dict[str, Any], job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = QUEUED
+        self.results: List[Any] = []
+        self.error: Optional[str] = None
+        self.retry_after: Optional[float] = None
+        self.plan_id: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def notify(self) -> None:
+        """Wake everyone long-polling this job."""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self, timeout: float, since: int = 0) -> None:
+        """Return once the job has finished or has more than `since` results, or after `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        while not self.finished and len(self.results) <= since:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "results": self.results,
+            "plan_id": self.plan_id,
+            "error": self.error,
+            "retry_after": self.retry_after,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+_COLUMNS = ("id", "kind", "params", "status", "results", "error", "retry_after", "plan_id", "created_at", "started_at", "finished_at", "owner")
+
+
+class JobStore:
+    """
+    Job records in a SQLite table shared by every backend process on the host, so
+    that any uvicorn worker can accept a job, run it and answer polls for it, and the
+    queue's capacity is counted across all of them. Without a path the table lives in
+    memory and only works for a single process.
+    """
+
+    def __init__(self, path: Optional[str] = None, table: str = "jobs"):
+        self.table = table
+        self._lock = threading.Lock()
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False, isolation_level=None)
+        if path:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, params TEXT NOT NULL, status TEXT NOT NULL, "
+            "results TEXT NOT NULL, error TEXT, retry_after REAL, plan_id TEXT, created_at REAL NOT NULL, "
+            "started_at REAL, finished_at REAL, owner INTEGER)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_status ON {table} (status, created_at)")
+
+    @staticmethod
+    def _row(job: Job, owner: Optional[int]) -> tuple:
+        return (
+            job.id, job.kind, json.dumps(job.params), job.status, json.dumps(job.results), job.error,
+            job.retry_after, job.plan_id, job.created_at, job.started_at, job.finished_at, owner,
+        )
+
+    @staticmethod
+    def _job(row: tuple) -> Job:
+        values = dict(zip(_COLUMNS, row))
+        job = Job(values["kind"], json.loads(values["params"]), values["id"])
+        job.status = values["status"]
+        job.results = json.loads(values["results"])
+        for name in ("error", "retry_after", "plan_id", "created_at", "started_at", "finished_at"):
+            setattr(job, name, values[name])
+        return job
+
+    def insert(self, job: Job, max_queued: int) -> bool:
+        """Add a queued job unless `max_queued` jobs are already waiting; False when full."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                (queued,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table} WHERE status = ?", (QUEUED,)).fetchone()
+                if queued >= max_queued:
+                    return False
+                self._conn.execute(f"INSERT INTO {self.table} VALUES ({', '.join('?' for _ in _COLUMNS)})", self._row(job, None))
+                return True
+            finally:
+                self._conn.execute("COMMIT")
+
+    def claim(self, kinds: List[str]) -> Optional[Job]:
+        """Mark the oldest queued job of one of `kinds` as running in this process and return it."""
+        query = (
+            f"SELECT {', '.join(_COLUMNS)} FROM {self.table} WHERE status = ? AND kind IN ({', '.join('?' for _ in kinds)}) "
+            "ORDER BY created_at LIMIT 1"
+        )
+        with self._lock:
+            # Look before taking the write lock, so an empty queue never blocks other processes' writes
+            if self._conn.execute(query, (QUEUED, *kinds)).fetchone() is None:
+                return None
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(query, (QUEUED, *kinds)).fetchone()
+                if row is None:
+                    return None
+                job = self._job(row)
+                job.status = RUNNING
+                job.started_at = time.time()
+                self._conn.execute(
+                    f"UPDATE {self.table} SET status = ?, started_at = ?, owner = ? WHERE id = ?",
+                    (job.status, job.started_at, os.getpid(), job.id),
+                )
+                return job
+            finally:
+                self._conn.execute("COMMIT")
+
+    def save(self, job: Job) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE {self.table} SET status = ?, results = ?, error = ?, retry_after = ?, plan_id = ?, finished_at = ? WHERE id = ?",
+                (job.status, json.dumps(job.results), job.error, job.retry_after, job.plan_id, job.finished_at, job.id),
+            )
+
+    def load(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM {self.table} WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row is not None else None
+
+    def purge(self, finished_before: float) -> None:
+        """Delete finished jobs, and fail running jobs whose process has exited."""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE finished_at < ?", (finished_before,))
+            owners = [owner for (owner,) in self._conn.execute(f"SELECT DISTINCT owner FROM {self.table} WHERE status = ?", (RUNNING,))]
+            for owner in owners:
+                if owner is not None and not _process_alive(owner):
+                    self._conn.execute(
+                        f"UPDATE {self.table} SET status = ?, error = ?, finished_at = ? WHERE status = ? AND owner = ?",
+                        (FAILED, "Worker process exited", time.time(), RUNNING, owner),
+                    )
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT status, COUNT(*) FROM {self.table} GROUP BY status").fetchall()
+        return dict(rows)
+
+    def average_duration(self, recent: int = 20) -> Optional[float]:
+        """Mean run time of the most recently finished jobs."""
+        with self._lock:
+            (average,) = self._conn.execute(
+                f"SELECT AVG(finished_at - started_at) FROM (SELECT finished_at, started_at FROM {self.table} "
+                "WHERE finished_at IS NOT NULL AND started_at IS NOT NULL ORDER BY finished_at DESC LIMIT ?)",
+                (recent,),
+            ).fetchone()
+        return average
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Runs a job: yields its results one by one and returns nothing
+JobRunner = Callable[[Job], AsyncIterator[Any]]
+
+
+class JobQueue:
+    """
+    Bounded queue of background jobs run by up to `workers` tasks per process.
+
+    submit() never waits: when `max_queued` jobs are already waiting it raises
+    QueueFullError with a Retry-After estimate from recent job durations, so
+    overload turns into explicit backpressure instead of piling up requests.
+    Each job's runner yields partial results, which pollers see immediately.
+    Finished jobs are kept for `ttl` seconds.
+
+    Jobs live in a JobStore. With an on-disk store, every process started with the
+    same path shares one queue: workers in any process claim queued jobs, and any
+    process answers polls, following jobs run elsewhere by re-reading the store
+    every `poll_interval` seconds. Each process has a single poller that claims jobs
+    while one of its workers is free.
+    """
+
+    def __init__(self, workers: int = 4, max_queued: int = 100, ttl: float = 600, store: Optional[JobStore] = None, poll_interval: float = 0.25):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.store = store or JobStore()
+        # Jobs running in this process, whose pollers are woken directly
+        self._running: Dict[str, Job] = {}
+        self._runners: Dict[str, JobRunner] = {}
+        self._tasks: Set["asyncio.Task"] = set()
+        self._poller: Optional["asyncio.Task"] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.submitted = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def register(self, kind: str, runner: JobRunner) -> None:
+        self._runners[kind] = runner
+
+    def start(self) -> None:
+        """Start the poller. Must run on the event loop."""
+        self._wake = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._poller = asyncio.get_running_loop().create_task(self._poll())
+
+    async def submit(self, kind: str, params: Dict[str, Any]) -> Job:
+        await asyncio.to_thread(self.store.purge, time.time() - self.ttl)
+        job = Job(kind, params)
+        if not await asyncio.to_thread(self.store.insert, job, self.max_queued):
+            self.rejected += 1
+            raise QueueFullError(await asyncio.to_thread(self.retry_after))
+        self.submitted += 1
+        if self._wake is not None:
+            self._wake.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        job = self._running.get(job_id)
+        if job is not None:
+            return job
+        return await asyncio.to_thread(self.store.load, job_id)
+
+    async def wait(self, job_id: str, timeout: float, since: int = 0) -> Optional[Job]:
+        """
+        The job once it has finished or has more than `since` results, or as it is after
+        `timeout` seconds. None for an unknown job.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.get(job_id)
+            if job is None or job.finished or len(job.results) > since:
+                return job
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return job
+            running = self._running.get(job_id)
+            if running is not None:
+                # Claimed here since `job` was read from the store: wait on the live job
+                await running.wait(remaining, since)
+                return await self.get(job_id)
+            await asyncio.sleep(min(self.poll_interval, remaining))
+
+    def retry_after(self) -> float:
+        """Rough time until a queue slot frees up: one average job duration per worker's share of the queue."""
+        average = self.store.average_duration() or 10.0
+        return max(1.0, average * self.store.counts().get(QUEUED, 0) / self.workers)
+
+    async def _poll(self) -> None:
+        """Claim queued jobs while a worker is free, running each as its own task."""
+        while True:
+            await self._slots.acquire()
+            self._wake.clear()
+            job = await asyncio.to_thread(self.store.claim, list(self._runners))
+            if job is None:
+                self._slots.release()
+                # Jobs submitted to other processes are only seen by polling the store
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            task = asyncio.get_running_loop().create_task(self._run(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._finished)
+
+    def _finished(self, task: "asyncio.Task") -> None:
+        self._tasks.discard(task)
+        self._slots.release()
+
+    async def _run(self, job: Job) -> None:
+        self._running[job.id] = job
+        job.notify()
+        try:
+            async for result in self._runners[job.kind](job):
+                job.results.append(result)
+                await asyncio.to_thread(self.store.save, job)
+                job.notify()
+            job.status = SUCCEEDED
+            self.succeeded += 1
+        except asyncio.CancelledError:
+            job.status = FAILED
+            job.error = "Cancelled"
+            raise
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.status = FAILED
+            job.error = str(e)
+            job.retry_after = getattr(e, "retry_after", None)
+            self.failed += 1
+        finally:
+            job.finished_at = time.time()
+            try:
+                await asyncio.to_thread(self.store.save, job)
+            except sqlite3.Error as e:
+                print(f"Job {job.id} could not be saved: {e}")
+            del self._running[job.id]
+            job.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        counts = self.store.counts()
+        return {
+            "workers": self.workers,
+            "queued": counts.get(QUEUED, 0),
+            "capacity": self.max_queued,
+            "running": counts.get(RUNNING, 0),
+            "running_here": len(self._running),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "average_duration": self.store.average_duration(),
+        }
+
+    async def shutdown(self) -> None:
+        tasks = [task for task in (self._poller, *self._tasks) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._poller = None
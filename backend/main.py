@@ -1,18 +1,166 @@
-from fastapi import FastAPI, HTTPException
+import os
+import asyncio
+import json
+import math
+from contextlib import asynccontextmanager
+from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional
-from services.llm_client import GeminiLLM
-from services.serper_client import get_comprehensive_resources, get_limited_resources_for_overview
+from typing import AsyncIterator, List, Dict, Optional
+from backend.instrumentation import MetricsMiddleware
+from backend.jobs import Job, JobQueue, JobStore, QueueFullError
+from backend.plan_store import PlanStore, etag_matches
+from backend.prefetch import PrefetchStore, prefetch_key
+from services.cache import TieredCache
+from services.circuit_breaker import CircuitOpenError, any_open, breaker_stats
+from services.config import load_settings
+from services.deadline import DeadlineExceeded, request_deadline, within_deadline
+from services.llm_client import GeminiLLM, aget_llm, day_number_of, gemini_api_key, plan_cache, start_warm_up, topic_index, warm_up_status
+from services.metrics import count_fallback, render_prometheus, stage
+from services.scheduler import Priority, RateLimitedError, request_priority, scheduler_stats
+from services.schemas import DayPlan, DetailedDayPlan
+from services.singleflight import singleflight_stats
+from services.serper_client import (
+    aget_comprehensive_resources, aget_limited_resources_for_overview, aget_plan_overview_resources, acached_comprehensive_resources,
+    acached_overview_resources,
+    get_default_client, resource_index, search_cache,
+)
+
+load_settings()
+
+# Number of streamed days enriched with Serper resources at the same time (/generate_plan batches all days together)
+PLAN_ENRICH_CONCURRENCY = int(os.getenv("PLAN_ENRICH_CONCURRENCY", "7"))
+
+# Speculative prefetch of detailed days after a plan is generated (0 disables it)
+PREFETCH_DAYS = int(os.getenv("PREFETCH_DAYS", "0"))
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "2"))
+PREFETCH_TTL = float(os.getenv("PREFETCH_TTL", "600"))
+
+_enrich_semaphore = asyncio.Semaphore(PLAN_ENRICH_CONCURRENCY)
+
+prefetch_store = PrefetchStore(max_concurrency=PREFETCH_CONCURRENCY, ttl=PREFETCH_TTL)
+
+# Generated plans and detailed days, served by GET /plans/{id} and /plans/{id}/days/{n}
+PLAN_STORE_TTL = int(os.getenv("PLAN_STORE_TTL", str(30 * 24 * 3600)))
+plan_store = PlanStore(TieredCache(
+    ttl=PLAN_STORE_TTL,
+    memory_entries=int(os.getenv("PLAN_STORE_MEMORY_ENTRIES", "512")),
+    disk_path=os.getenv("PLAN_STORE_PATH", ".cache/skillpath.sqlite3") or None,
+    table="stored_plans",
+))
+
+# Cache-Control lifetimes: a plan ID names immutable content; a stored day only changes if it expires.
+# Neither outlives the store, so caches stop serving a plan about when GET /plans/{id} starts answering 404.
+PLAN_MAX_AGE = min(int(os.getenv("PLAN_MAX_AGE", str(PLAN_STORE_TTL))), PLAN_STORE_TTL)
+PLAN_DAY_MAX_AGE = min(int(os.getenv("PLAN_DAY_MAX_AGE", str(24 * 3600))), PLAN_STORE_TTL)
+
+# Background plan jobs (POST /jobs/plan): worker count, queued jobs accepted before 429, seconds results are kept
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_TTL = float(os.getenv("JOB_TTL", "600"))
+# Longest a GET /jobs/{id}?wait=... long-poll is held open
+JOB_MAX_WAIT = float(os.getenv("JOB_MAX_WAIT", "30"))
+
+# Jobs are kept in SQLite so every uvicorn worker shares one queue (empty = in memory, single worker only)
+job_queue = JobQueue(
+    workers=JOB_WORKERS,
+    max_queued=JOB_QUEUE_SIZE,
+    ttl=JOB_TTL,
+    store=JobStore(os.getenv("JOB_STORE_PATH", ".cache/skillpath.sqlite3") or None),
+)
+
+# Requests slower than this many seconds are logged with their stage breakdown (0 disables it)
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "0"))
+
+# Seconds /generate_plan and /get_detailed_day may spend on upstream calls (0 = unbounded).
+# Days whose resources are not ready in time fall back to cached or LLM resources and are
+# listed in the X-Degraded-Days response header.
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "45"))
+# The same for a background plan job; nobody holds a connection open, so it gets longer
+JOB_DEADLINE = float(os.getenv("JOB_DEADLINE", "120"))
+
+# Answer /ready with 503 while an upstream circuit breaker is open, so load balancers route around this instance.
+# /health stays 200 either way: it is the liveness check, and failing it would get a working process restarted.
+READY_FAIL_WHEN_DEGRADED = os.getenv("READY_FAIL_WHEN_DEGRADED", "0") == "1"
+
+# Retry-After sent with a 429 when the upstream provider did not suggest one
+DEFAULT_RETRY_AFTER = int(os.getenv("DEFAULT_RETRY_AFTER", "10"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # A missing GEMINI_API_KEY aborts startup here. The Gemini client itself is built on a
+    # background thread, so /health answers at once and /ready reports when it is warm.
+    gemini_api_key()
+    start_warm_up()
+    serper = get_default_client()
+    job_queue.register("plan", run_plan_job)
+    job_queue.start()
+    yield
+    await job_queue.shutdown()
+    prefetch_store.shutdown()
+    await serper.aclose()
 
 app = FastAPI(
     title="SkillPath AI Backend",
     description="Generates personalized 7-day learning plans",
-    version="0.1"
+    version="0.1",
+    lifespan=lifespan
 )
+app.add_middleware(MetricsMiddleware, slow_request_seconds=SLOW_REQUEST_SECONDS)
+
+async def get_llm_client() -> GeminiLLM:
+    """Dependency returning the process-wide LLM client, waiting for the startup warm-up if it is still running."""
+    return await aget_llm()
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "message": "SkillPath AI Backend is running"}
+    """Liveness probe: 200 whenever the server answers; an open circuit shows as "degraded" in the body."""
+    return {
+        "status": "degraded" if any_open() else "healthy",
+        "message": "SkillPath AI Backend is running",
+        "llm": warm_up_status(),
+        "serper_cache": search_cache.stats(),
+        "plan_cache": plan_cache.stats(),
+        "topic_index": topic_index.stats(),
+        "resource_index": resource_index.stats() if resource_index is not None else None,
+        "prefetch": prefetch_store.stats(),
+        "plan_store": plan_store.stats(),
+        "jobs": job_queue.stats(),
+        "singleflight": singleflight_stats(),
+        "scheduler": scheduler_stats(),
+        "circuit_breakers": breaker_stats(),
+        "serper_client": get_default_client().stats(),
+    }
+
+@app.get("/ready")
+def readiness_check(response: Response):
+    """
+    Readiness probe: 503 until the Gemini client has been built, so new replicas get traffic only once warm,
+    and, with READY_FAIL_WHEN_DEGRADED, while an upstream circuit breaker is open.
+    """
+    status = {**warm_up_status(), "degraded": any_open()}
+    if status["status"] != "ready" or (status["degraded"] and READY_FAIL_WHEN_DEGRADED):
+        response.status_code = 503
+    return status
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Stage latencies, fallback counters and request sizes in the Prometheus text format."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+def upstream_error(error: Exception, detail: str) -> HTTPException:
+    """
+    Map a generation failure to an HTTP error: 429 with Retry-After when an upstream quota ran out,
+    503 with Retry-After while its circuit breaker is open, 504 when the request's deadline passed first, else 500.
+    """
+    if isinstance(error, DeadlineExceeded):
+        return HTTPException(status_code=504, detail=str(error))
+    if isinstance(error, CircuitOpenError):
+        return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": str(math.ceil(error.retry_after) or 1)})
+    if isinstance(error, RateLimitedError):
+        retry_after = math.ceil(error.retry_after or DEFAULT_RETRY_AFTER)
+        return HTTPException(status_code=429, detail=str(error), headers={"Retry-After": str(retry_after)})
+    return HTTPException(status_code=500, detail=detail)
 
 class PlanRequest(BaseModel):
     topic: str
@@ -21,64 +169,264 @@ class DetailedDayRequest(BaseModel):
     topic: str
     day_topic: str
     day_number: int
+    plan_id: Optional[str] = None
 
-class Resource(BaseModel):
-    type: str
-    title: str
-    url: str
-    snippet: Optional[str] = None
+class PrefetchCancelRequest(BaseModel):
+    topic: Optional[str] = None
 
-class DayPlan(BaseModel):
-    day: str
-    topic: str
-    mini_challenge: str
-    reasoning: str
-    resources: List[Resource]
+async def use_fallback_resources(topic: str, day: Dict, error: Exception) -> Dict:
+    """
+    Resources for a day whose Serper enrichment failed: the LLM ones. When the request's
+    deadline passed first, or Serper's circuit is open, cached results are preferred and
+    the day is marked degraded.
+    """
+    if isinstance(error, (DeadlineExceeded, CircuitOpenError)):
+        count_fallback("circuit_open" if isinstance(error, CircuitOpenError) else "deadline_resources")
+        day['resources'] = await acached_overview_resources(topic, day['topic']) or day.get('resources', [])[:3]
+        day['degraded'] = True
+        return day
+    print(f"Serper API failed for {day['topic']}: {error}")
+    count_fallback("llm_resources")
+    # Continue with LLM-generated resources if Serper fails
+    if day.get('resources'):
+        day['resources'] = day['resources'][:3]
+    return day
 
-class DetailedDayPlan(BaseModel):
-    day: str
-    topic: str
-    detailed_description: str
-    learning_objectives: List[str]
-    mini_challenge: str
-    detailed_challenge: str
-    step_by_step_guide: List[str]
-    key_concepts: List[str]
-    reasoning: str
-    estimated_time: str
-    difficulty_level: str
-    prerequisites: List[str]
-    resources: List[Resource]
-    next_steps: str
+async def enrich_day(topic: str, day: Dict) -> Dict:
+    """Replace a day's LLM resources with curated Serper resources, falling back as use_fallback_resources describes."""
+    try:
+        # Use limited resources for overview page (1 YouTube, 1 Article, 1 Blog)
+        async with _enrich_semaphore:
+            with stage("enrich_day"):
+                day['resources'] = await within_deadline(aget_limited_resources_for_overview(topic, day['topic']), "serper")
+    except Exception as serper_error:
+        await use_fallback_resources(topic, day, serper_error)
+    return day
+
+async def enrich_plan(topic: str, plan: List[Dict]) -> List[Dict]:
+    """
+    Enrich every day of a plan, preserving day order. The days' searches are planned
+    together and sent as batched Serper requests, one round trip for the whole plan.
+    """
+    try:
+        with stage("enrich_plan"):
+            resources = await within_deadline(aget_plan_overview_resources(topic, [day['topic'] for day in plan]), "serper")
+    except Exception as serper_error:
+        return [await use_fallback_resources(topic, day, serper_error) for day in plan]
+    for day, day_resources in zip(plan, resources):
+        day['resources'] = day_resources
+    return plan
+
+async def build_detailed_day(llm: GeminiLLM, topic: str, day_topic: str, day_number: int) -> Dict:
+    """Generate a detailed day plan and attach comprehensive Serper resources."""
+    detailed_plan = await llm.agenerate_detailed_day_plan(topic, day_topic, day_number)
+    
+    # Get comprehensive resources from Serper
+    try:
+        serper_resources = await within_deadline(aget_comprehensive_resources(topic, day_topic), "serper")
+        detailed_plan['resources'] = serper_resources
+    except (DeadlineExceeded, CircuitOpenError) as e:
+        count_fallback("circuit_open" if isinstance(e, CircuitOpenError) else "deadline_resources")
+        detailed_plan['resources'] = await acached_comprehensive_resources(topic, day_topic) or detailed_plan.get('resources', [])
+        detailed_plan['degraded'] = True
+    except Exception as serper_error:
+        print(f"Serper API failed for detailed day: {serper_error}")
+        count_fallback("llm_resources")
+        # Use LLM-generated resources as fallback
+        if 'resources' not in detailed_plan:
+            detailed_plan['resources'] = []
+    
+    return detailed_plan
+
+async def prefetch_detailed_days(llm: GeminiLLM, topic: str, plan: List[Dict]) -> None:
+    """Queue background builds of the first PREFETCH_DAYS detailed days of a plan."""
+    for number, day in enumerate(plan[:PREFETCH_DAYS], 1):
+        key = prefetch_key(topic, day['topic'], number)
+        prefetch_store.schedule(key, lambda day_topic=day['topic'], number=number: build_detailed_day(llm, topic, day_topic, number))
+
+def stored_response(http_request: Request, document: Dict[str, str], max_age: int, immutable: bool = False) -> Response:
+    """Serve a stored document with its ETag and Cache-Control, or 304 when the client already has it."""
+    headers = {"ETag": document["etag"], "Cache-Control": f"public, max-age={max_age}" + (", immutable" if immutable else "")}
+    if etag_matches(http_request.headers.get("if-none-match"), document["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(document["body"], media_type="application/json", headers=headers)
+
+def flag_degraded(validated: Dict, day: Dict) -> Dict:
+    """A validated day for a streamed line or job result, marked "degraded" when it was served with fallback resources."""
+    return {**validated, "degraded": True} if day.get('degraded') else validated
+
+def link_plan(response: Response, plan_id: str, path: str) -> None:
+    response.headers["X-Plan-Id"] = plan_id
+    response.headers["Content-Location"] = path
+
+def report_degraded(response: Response, day_numbers: List[int]) -> None:
+    """List the days served with fallback resources because the deadline passed."""
+    if day_numbers:
+        response.headers["X-Degraded-Days"] = ",".join(str(number) for number in day_numbers)
 
 @app.post("/generate_plan", response_model=List[DayPlan])
-def generate_plan(request: PlanRequest):
+async def generate_plan(request: PlanRequest, background_tasks: BackgroundTasks, response: Response, llm: GeminiLLM = Depends(get_llm_client)):
     if not request.topic.strip():
         raise HTTPException(status_code=400, detail="Topic cannot be empty")
     
     try:
-        llm = GeminiLLM()
-        plan = llm.generate_learning_plan(request.topic)
-        
-        # Enhance resources with Serper API for each day
-        for day in plan:
-            try:
-                # Use limited resources for overview page (1 YouTube, 1 Article, 1 Blog)
-                serper_resources = get_limited_resources_for_overview(request.topic, day['topic'])
-                # Replace LLM resources with curated Serper resources
-                day['resources'] = serper_resources
-            except Exception as serper_error:
-                print(f"Serper API failed for {day['topic']}: {serper_error}")
-                # Continue with LLM-generated resources if Serper fails
-                if day.get('resources'):
-                    day['resources'] = day['resources'][:3]
-        
-        return plan
+        with request_deadline(REQUEST_DEADLINE):
+            plan = await llm.agenerate_learning_plan(request.topic)
+            
+            # Enhance resources with Serper API for all days in parallel
+            plan = await enrich_plan(request.topic, plan)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise upstream_error(e, str(e))
+    
+    report_degraded(response, [day_number_of(day) or number for number, day in enumerate(plan, 1) if day.get('degraded')])
+    plan_id = await plan_store.asave_plan(request.topic, [DayPlan.model_validate(day).model_dump() for day in plan])
+    link_plan(response, plan_id, f"/plans/{plan_id}")
+    
+    if PREFETCH_DAYS > 0:
+        background_tasks.add_task(prefetch_detailed_days, llm, request.topic, plan)
+    return plan
+
+async def stream_enriched_plan(llm: GeminiLLM, topic: str, budget: float) -> AsyncIterator[Dict]:
+    """
+    Yield enriched days in order, each as soon as it and the days before it are ready.
+    A reader task consumes the LLM stream and starts enriching every parsed day
+    right away, so Serper lookups overlap with generation. Everything gets `budget`
+    seconds: days enriched too late come back degraded, and if Gemini has not
+    finished by then the stream ends with DeadlineExceeded after the days it sent.
+    """
+    pending: "asyncio.Queue" = asyncio.Queue()
+    
+    async def feed():
+        async for day in llm.astream_learning_plan(topic):
+            pending.put_nowait(asyncio.ensure_future(enrich_day(topic, day)))
+    
+    async def read_llm():
+        try:
+            await within_deadline(feed(), "gemini")
+        except Exception as e:
+            pending.put_nowait(e)
+        finally:
+            pending.put_nowait(None)
+    
+    # The reader and the enrichment tasks it starts carry the budget
+    with request_deadline(budget):
+        reader = asyncio.create_task(read_llm())
+    try:
+        while True:
+            item = await pending.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield await item
+    finally:
+        # Stop generating if the client went away mid-stream
+        reader.cancel()
+
+@app.post("/generate_plan/stream")
+async def generate_plan_stream(request: PlanRequest, llm: GeminiLLM = Depends(get_llm_client)):
+    """
+    Stream the plan as NDJSON: one DayPlan object per line, sent as each day is generated and enriched,
+    then a final {"plan_id": ...} line naming the stored plan (as X-Plan-Id does for /generate_plan).
+    Days served with fallback resources (see X-Degraded-Days) carry "degraded": true.
+    A failure after streaming has started is reported as a final {"error": ...} line.
+    """
+    if not request.topic.strip():
+        raise HTTPException(status_code=400, detail="Topic cannot be empty")
+    
+    async def ndjson():
+        plan = []
+        try:
+            async for day in stream_enriched_plan(llm, request.topic, REQUEST_DEADLINE):
+                validated = DayPlan.model_validate(day).model_dump()
+                yield json.dumps(flag_degraded(validated, day)) + "\n"
+                plan.append(validated)
+        except Exception as e:
+            print(f"Error streaming plan for {request.topic}: {e}")
+            yield json.dumps({"error": str(e)}) + "\n"
+            return
+        yield json.dumps({"plan_id": await plan_store.asave_plan(request.topic, plan)}) + "\n"
+        
+        if PREFETCH_DAYS > 0:
+            await prefetch_detailed_days(llm, request.topic, plan)
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+async def request_plan_id(request: DetailedDayRequest) -> Optional[str]:
+    """
+    The plan a detailed day request may be served from and stored under: its plan_id, once the
+    stored plan is confirmed to have this day. None when the request names no plan or the plan
+    has expired; 409 when the plan exists but the day is not one of its days.
+    """
+    if not request.plan_id:
+        return None
+    matches = await plan_store.aday_matches(request.plan_id, request.topic, request.day_topic, request.day_number)
+    if matches is False:
+        raise HTTPException(status_code=409, detail=f"Day {request.day_number} of plan {request.plan_id} is not '{request.day_topic}'")
+    return request.plan_id if matches else None
+
+async def store_day(request: DetailedDayRequest, plan_id: Optional[str], response: Response, detailed_plan: Dict) -> Dict:
+    """
+    Store a detailed day under its plan, if any, and point the response at it.
+    Degraded days are reported in the headers and not stored.
+    """
+    if detailed_plan.get('degraded'):
+        report_degraded(response, [request.day_number])
+    elif plan_id and await plan_store.asave_day(plan_id, request.day_number, DetailedDayPlan.model_validate(detailed_plan).model_dump()):
+        link_plan(response, plan_id, f"/plans/{plan_id}/days/{request.day_number}")
+    return detailed_plan
+
+async def run_plan_job(job: Job) -> AsyncIterator[Dict]:
+    """
+    Generate and enrich a plan for a job within JOB_DEADLINE, yielding each day as soon as it
+    and the days before it are ready. Degraded days are flagged as in the streaming endpoint.
+    """
+    llm = await aget_llm()
+    topic = job.params["topic"]
+    plan = []
+    async for day in stream_enriched_plan(llm, topic, JOB_DEADLINE):
+        validated = DayPlan.model_validate(day).model_dump()
+        plan.append(validated)
+        yield flag_degraded(validated, day)
+    job.plan_id = await plan_store.asave_plan(topic, plan)
+    
+    if PREFETCH_DAYS > 0:
+        await prefetch_detailed_days(llm, topic, plan)
+
+@app.post("/jobs/plan", status_code=202)
+async def submit_plan_job(request: PlanRequest, response: Response):
+    """
+    Queue plan generation and return the job right away; poll GET /jobs/{id} for progress.
+    Answers 429 with Retry-After when the queue is full.
+    """
+    if not request.topic.strip():
+        raise HTTPException(status_code=400, detail="Topic cannot be empty")
+    
+    try:
+        job = await job_queue.submit("plan", {"topic": request.topic})
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0, since: int = 0):
+    """
+    A job's status and the results so far (for plan jobs, the finished days in order).
+    With wait=N, holds the request up to N seconds (at most JOB_MAX_WAIT) until the job
+    finishes or has more than `since` results.
+    """
+    job = await job_queue.wait(job_id, min(wait, JOB_MAX_WAIT), since)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 @app.post("/get_detailed_day", response_model=DetailedDayPlan)
-def get_detailed_day(request: DetailedDayRequest):
+async def get_detailed_day(request: DetailedDayRequest, response: Response, llm: GeminiLLM = Depends(get_llm_client)):
+    """
+    Generate a detailed day. With the plan_id from /generate_plan, the day is also stored under that plan;
+    the request's topic, day topic and day number must then match the stored plan.
+    """
     print(f"Received detailed day request: topic='{request.topic}', day_topic='{request.day_topic}', day_number={request.day_number}")
     
     if not request.topic.strip() or not request.day_topic.strip():
@@ -87,21 +435,50 @@ def get_detailed_day(request: DetailedDayRequest):
     if request.day_number < 1 or request.day_number > 7:
         raise HTTPException(status_code=400, detail="Day number must be between 1 and 7")
     
-    try:
-        llm = GeminiLLM()
-        detailed_plan = llm.generate_detailed_day_plan(request.topic, request.day_topic, request.day_number)
-        
-        # Get comprehensive resources from Serper
+    plan_id = await request_plan_id(request)
+    if plan_id:
+        stored = await plan_store.aget_day(plan_id, request.day_number)
+        if stored is not None:
+            stored_day = Response(stored["body"], media_type="application/json", headers={"ETag": stored["etag"]})
+            link_plan(stored_day, plan_id, f"/plans/{plan_id}/days/{request.day_number}")
+            return stored_day
+    
+    # Serve a prefetched day, or wait for a prefetch that is already running
+    prefetched = prefetch_store.get(prefetch_key(request.topic, request.day_topic, request.day_number))
+    if prefetched is not None:
         try:
-            serper_resources = get_comprehensive_resources(request.topic, request.day_topic)
-            detailed_plan['resources'] = serper_resources
-        except Exception as serper_error:
-            print(f"Serper API failed for detailed day: {serper_error}")
-            # Use LLM-generated resources as fallback
-            if 'resources' not in detailed_plan:
-                detailed_plan['resources'] = []
-        
-        return detailed_plan
+            # Shield the shared task so a disconnecting client does not cancel it for others
+            return await store_day(request, plan_id, response, await asyncio.shield(prefetched))
+        except Exception as e:
+            print(f"Prefetch failed for {request.day_topic}, generating directly: {e}")
+            count_fallback("prefetch_failed")
+    
+    try:
+        # A user is waiting on this day, so its upstream calls go ahead of bulk and background work
+        with request_priority(Priority.INTERACTIVE), request_deadline(REQUEST_DEADLINE):
+            return await store_day(request, plan_id, response, await build_detailed_day(llm, request.topic, request.day_topic, request.day_number))
     except Exception as e:
         print(f"Error generating detailed day plan: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to generate detailed day plan: {str(e)}")
+        raise upstream_error(e, f"Failed to generate detailed day plan: {str(e)}")
+
+@app.get("/plans/{plan_id}")
+def get_plan(plan_id: str, http_request: Request):
+    """A stored plan: {"id", "topic", "plan"}. Plans never change, so it is cacheable indefinitely."""
+    document = plan_store.get_plan(plan_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    return stored_response(http_request, document, PLAN_MAX_AGE, immutable=True)
+
+@app.get("/plans/{plan_id}/days/{day_number}")
+def get_plan_day(plan_id: str, day_number: int, http_request: Request):
+    """A stored detailed day of a plan, as returned by /get_detailed_day."""
+    document = plan_store.get_day(plan_id, day_number)
+    if document is None:
+        detail = "Plan not found" if plan_store.get_plan(plan_id) is None else "Day not generated for this plan"
+        raise HTTPException(status_code=404, detail=detail)
+    return stored_response(http_request, document, PLAN_DAY_MAX_AGE)
+
+@app.post("/prefetch/cancel")
+async def cancel_prefetch(request: PrefetchCancelRequest):
+    """Cancel queued prefetches for a topic (or for every topic when none is given)."""
+    return {"cancelled": prefetch_store.cancel(request.topic)}
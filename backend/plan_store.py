@@ -0,0 +1,100 @@
+import hashlib
+from typing import Dict, List, Optional
+import orjson
+from services.cache import TieredCache
+from services.llm_client import day_number_of, normalize_topic
+
+Document = Dict[str, str]
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:32]
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag (weak comparison, as RFC 9110 requires for it)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(","))
+
+
+class PlanStore:
+    """
+    Generated plans and detailed days, addressable by plan ID.
+
+    A plan's ID is the hash of its topic and days, so the same plan always gets
+    the same ID and a stored plan never changes. A detailed day is stored under
+    its plan the first time it is generated and then kept as it is; callers check
+    with aday_matches() that the day belongs to the plan before storing or serving it. Documents are
+    kept already encoded together with a strong ETag over the encoded body, so
+    GET requests serve stored bytes without serializing anything. Writes are
+    async and keep SQLite off the event loop; the sync getters serve the sync GET handlers.
+    """
+
+    def __init__(self, cache: TieredCache):
+        self.cache = cache
+
+    @staticmethod
+    def _document(value) -> Document:
+        body = orjson.dumps(value)
+        return {"body": body.decode(), "etag": f'"{content_hash(body)}"'}
+
+    @staticmethod
+    def _plan_id(topic: str, plan: List[Dict]) -> str:
+        return content_hash(orjson.dumps({"topic": topic, "plan": plan}, option=orjson.OPT_SORT_KEYS))
+
+    async def asave_plan(self, topic: str, plan: List[Dict]) -> str:
+        """Store a plan (unless it is already stored) and return its ID."""
+        plan_id = self._plan_id(topic, plan)
+        if await self.cache.aget(f"plan:{plan_id}") is None:
+            await self.cache.aset(f"plan:{plan_id}", self._document({"id": plan_id, "topic": topic, "plan": plan}))
+        return plan_id
+
+    def get_plan(self, plan_id: str) -> Optional[Document]:
+        entry = self.cache.get(f"plan:{plan_id}")
+        return entry.value if entry is not None else None
+
+    async def aget_plan(self, plan_id: str) -> Optional[Document]:
+        entry = await self.cache.aget(f"plan:{plan_id}")
+        return entry.value if entry is not None else None
+
+    async def aday_matches(self, plan_id: str, topic: str, day_topic: str, day_number: int) -> Optional[bool]:
+        """
+        Whether a stored plan is for `topic` and has `day_topic` as its day `day_number`.
+        None when no such plan is stored.
+        """
+        document = await self.aget_plan(plan_id)
+        if document is None:
+            return None
+        stored = orjson.loads(document["body"])
+        days = stored["plan"]
+        # Streamed plans keep days in arrival order, so look the day up by its label first
+        day = next((day for day in days if day_number_of(day) == day_number), None)
+        if day is None and 1 <= day_number <= len(days):
+            day = days[day_number - 1]
+        return (
+            day is not None
+            and normalize_topic(stored["topic"]) == normalize_topic(topic)
+            and normalize_topic(day["topic"]) == normalize_topic(day_topic)
+        )
+
+    async def asave_day(self, plan_id: str, day_number: int, day: Dict) -> bool:
+        """Store a plan's detailed day unless one is already stored. False when the plan is unknown."""
+        if await self.aget_plan(plan_id) is None:
+            return False
+        if await self.aget_day(plan_id, day_number) is None:
+            await self.cache.aset(f"day:{plan_id}:{day_number}", self._document(day))
+        return True
+
+    def get_day(self, plan_id: str, day_number: int) -> Optional[Document]:
+        entry = self.cache.get(f"day:{plan_id}:{day_number}")
+        return entry.value if entry is not None else None
+
+    async def aget_day(self, plan_id: str, day_number: int) -> Optional[Document]:
+        entry = await self.cache.aget(f"day:{plan_id}:{day_number}")
+        return entry.value if entry is not None else None
+
+    def stats(self) -> Dict[str, int]:
+        return self.cache.stats()
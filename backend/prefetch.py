@@ -0,0 +1,127 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from services.llm_client import normalize_topic
+from services.scheduler import Priority, SharedPriority, request_priority
+
+PrefetchKey = Tuple[str, str, int]
+
+
+def prefetch_key(topic: str, day_topic: str, day_number: int) -> PrefetchKey:
+    return (normalize_topic(topic), normalize_topic(day_topic), day_number)
+
+
+class _Entry:
+    __slots__ = ("task", "created_at", "claimed", "started", "priority")
+
+    def __init__(self, created_at: float):
+        self.task: Optional["asyncio.Task"] = None
+        self.created_at = created_at
+        self.claimed = False
+        self.started = False
+        self.priority = SharedPriority(Priority.BACKGROUND)
+
+
+class PrefetchStore:
+    """
+    Speculatively built detailed day plans, keyed by (topic, day_topic, day_number).
+
+    Builds run as event-loop tasks behind their own semaphore, so at most
+    `max_concurrency` prefetches talk to upstream at once and interactive
+    requests keep the rest of the capacity. A request for a day that is already
+    prefetched, or still being prefetched, attaches to the same task instead of
+    starting a second generation, unless the build is still queued: then it is
+    dropped so the request can generate the day at interactive priority. Builds
+    run at background priority in the upstream scheduler until a request claims
+    them; then the build's waiting and later upstream calls move up to
+    interactive priority. Entries nobody asks for expire after `ttl` seconds and
+    are cancelled if still running. Failed builds are forgotten as soon as they
+    fail, so the next request or schedule() builds the day again.
+    """
+
+    def __init__(self, max_concurrency: int = 2, ttl: float = 600):
+        self.ttl = ttl
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._entries: Dict[PrefetchKey, _Entry] = {}
+        self.scheduled = 0
+        self.hits = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def schedule(self, key: PrefetchKey, build: Callable[[], Awaitable[Dict]]) -> None:
+        """Start a build for key unless one is already stored or running. Must run on the event loop."""
+        self._reap()
+        if key in self._entries:
+            return
+        entry = _Entry(time.time())
+        entry.task = asyncio.get_running_loop().create_task(self._run(entry, build))
+        entry.task.add_done_callback(lambda done: self._finished(key, entry, done))
+        self._entries[key] = entry
+        self.scheduled += 1
+
+    async def _run(self, entry: _Entry, build: Callable[[], Awaitable[Dict]]) -> Dict:
+        async with self._semaphore:
+            entry.started = True
+            with request_priority(entry.priority):
+                return await build()
+
+    def _finished(self, key: PrefetchKey, entry: _Entry, task: "asyncio.Task") -> None:
+        # Retrieving the exception also keeps failures of unclaimed prefetches from being reported as unhandled
+        if task.cancelled() or task.exception() is None:
+            return
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+            self.failed += 1
+
+    def get(self, key: PrefetchKey) -> Optional["asyncio.Task"]:
+        """Return the task for a prefetched or in-progress day, or None. Claimed tasks are never cancelled."""
+        entry = self._entries.get(key)
+        if entry is None or entry.task.cancelled():
+            return None
+        if entry.task.done() and entry.task.exception() is not None:
+            # Failed, and its done callback has not run yet
+            self._finished(key, entry, entry.task)
+            return None
+        if not entry.started:
+            # Still waiting behind other prefetches; the caller is better off building it now
+            self._drop(key)
+            return None
+        entry.claimed = True
+        # A user is now waiting on this build: stop queueing its upstream calls behind bulk work
+        entry.priority.raise_to(Priority.INTERACTIVE)
+        self.hits += 1
+        return entry.task
+
+    def cancel(self, topic: Optional[str] = None) -> int:
+        """Drop unclaimed prefetches for a topic (or all of them), cancelling any still running."""
+        topic_key = normalize_topic(topic) if topic else None
+        keys = [key for key, entry in self._entries.items() if not entry.claimed and (topic_key is None or key[0] == topic_key)]
+        return sum(self._drop(key) for key in keys)
+
+    def _reap(self) -> None:
+        cutoff = time.time() - self.ttl
+        for key in [key for key, entry in self._entries.items() if entry.created_at < cutoff]:
+            self._drop(key)
+
+    def _drop(self, key: PrefetchKey) -> int:
+        entry = self._entries.pop(key)
+        if not entry.claimed and not entry.task.done():
+            entry.task.cancel()
+            self.cancelled += 1
+            return 1
+        return 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "pending": sum(1 for entry in self._entries.values() if not entry.task.done()),
+            "scheduled": self.scheduled,
+            "hits": self.hits,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+        }
+
+    def shutdown(self) -> None:
+        for entry in self._entries.values():
+            entry.task.cancel()
+        self._entries.clear()
@@ -0,0 +1,54 @@
+"""
+Compare two benchmark result files scenario by scenario.
+
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+"""
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+METRICS = [
+    ("throughput_rps", lambda summary: summary.get("throughput_rps")),
+    ("p50 ms", lambda summary: summary.get("latency_ms", {}).get("p50")),
+    ("p95 ms", lambda summary: summary.get("latency_ms", {}).get("p95")),
+    ("p99 ms", lambda summary: summary.get("latency_ms", {}).get("p99")),
+    ("gemini calls", lambda summary: summary.get("upstream", {}).get("gemini_calls")),
+    ("serper queries", lambda summary: summary.get("upstream", {}).get("serper_queries")),
+    ("serper requests", lambda summary: summary.get("upstream", {}).get("serper_requests")),
+    ("rss MB", lambda summary: summary.get("backend_rss_mb")),
+    # benchmarks.import_time
+    ("import p50 ms", lambda summary: summary.get("import_ms", {}).get("p50")),
+    ("health ms", lambda summary: summary.get("health_ms")),
+    ("ready ms", lambda summary: summary.get("ready_ms")),
+]
+
+
+def change(before: Optional[float], after: Optional[float]) -> str:
+    if before in (None, 0) or after is None:
+        return ""
+    return f"{(after - before) / before * 100:+.1f}%"
+
+def compare(before: Dict, after: Dict) -> None:
+    print(f"before: {before.get('commit')}  {before.get('timestamp')}")
+    print(f"after:  {after.get('commit')}  {after.get('timestamp')}")
+    for scenario in after["scenarios"]:
+        if scenario not in before["scenarios"]:
+            continue
+        print(f"\n{scenario}")
+        for name, read in METRICS:
+            old, new = read(before["scenarios"][scenario]), read(after["scenarios"][scenario])
+            if old is None and new is None:
+                continue
+            print(f"  {name:<16}{str(old):>12}{str(new):>12}  {change(old, new)}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    args = parser.parse_args()
+    compare(json.loads(args.before.read_text()), json.loads(args.after.read_text()))
+
+
+if __name__ == "__main__":
+    main()
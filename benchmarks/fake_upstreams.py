@@ -0,0 +1,223 @@
+"""
+Local stand-ins for the Gemini and Serper HTTP APIs, used by the benchmark harness.
+
+Both servers run on 127.0.0.1 in background threads, draw each response's latency
+from a log-normal distribution, fail a configurable fraction of calls, and count
+every call they receive. The Gemini server speaks the REST protocol the SDK uses
+with GEMINI_TRANSPORT=rest and builds its JSON output from the request's
+response schema, so it follows the real plan and detailed-day shapes.
+"""
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# google.ai.generativelanguage Type enum values, as sent with enum-encoding=int
+_SCHEMA_TYPES = {1: "STRING", 2: "NUMBER", 3: "INTEGER", 4: "BOOLEAN", 5: "ARRAY", 6: "OBJECT"}
+
+_WORDS = "learn practice build concept example data model function project test review apply".split()
+
+
+class Latency:
+    """Log-normal latency with the given median (seconds); sigma controls the tail (p99 ≈ median * e^(2.33 sigma))."""
+
+    def __init__(self, median: float, sigma: float = 0.5):
+        self.median = median
+        self.sigma = sigma
+
+    def sample(self) -> float:
+        if self.median <= 0:
+            return 0.0
+        return self.median * math.exp(random.gauss(0, self.sigma))
+
+
+class _FakeServer:
+    """Threaded HTTP server with call counting shared by both fakes."""
+
+    def __init__(self, handler: type, latency: Latency, error_rate: float, error_status: int):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.calls = 0
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        handler.fake = self
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self) -> "_FakeServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def record_call(self, count: int = 1) -> bool:
+        """Count a request carrying `count` calls; returns True if it should fail."""
+        failed = random.random() < self.error_rate
+        with self._lock:
+            self.requests += 1
+            self.calls += count
+            if failed:
+                self.errors += 1
+        return failed
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "requests": self.requests, "errors": self.errors}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake: _FakeServer
+
+    def read_json(self) -> Any:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def send_json(self, status: int, body: Any) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# --- Gemini -----------------------------------------------------------------
+
+def fake_value(schema: Optional[Dict], words: int, name: str = "", index: int = 1) -> Any:
+    """Build a value matching a Gemini response schema, with `words` words per string."""
+    if not schema:
+        return None
+    kind = schema.get("type")
+    kind = _SCHEMA_TYPES.get(kind, kind) if isinstance(kind, int) else str(kind).upper()
+    if kind == "OBJECT":
+        return {key: fake_value(value, words, key, index) for key, value in schema.get("properties", {}).items()}
+    if kind == "ARRAY":
+        # Top-level arrays are plans: one item per day
+        count = 7 if not name else 3
+        return [fake_value(schema.get("items"), words, "", position) for position in range(1, count + 1)]
+    if kind in ("NUMBER", "INTEGER"):
+        return index
+    if kind == "BOOLEAN":
+        return True
+    if name == "day":
+        return f"Day {index}"
+    if name == "url":
+        return f"https://example.com/resource/{index}/{random.randrange(10 ** 6)}"
+    if name == "type":
+        return "Article"
+    return " ".join(random.choice(_WORDS) for _ in range(words))
+
+def fake_plan_output(words: int) -> Any:
+    """Output for free-form (schema-less) requests: a plan-shaped array."""
+    day = {"day": "", "topic": "", "mini_challenge": "", "reasoning": "", "resources": []}
+    return [{key: (f"Day {index}" if key == "day" else value or " ".join(random.choice(_WORDS) for _ in range(words)))
+             for key, value in day.items()} for index in range(1, 8)]
+
+
+class _GeminiHandler(_Handler):
+    fake: "FakeGemini"
+
+    def do_POST(self):
+        body = self.read_json() or {}
+        delay = self.fake.latency.sample()
+        if self.fake.record_call():
+            time.sleep(delay)
+            self.send_json(self.fake.error_status, {"error": {"code": self.fake.error_status, "message": "fake upstream error", "status": "UNAVAILABLE"}})
+            return
+
+        schema = (body.get("generationConfig") or body.get("generation_config") or {}).get("responseSchema")
+        output = fake_value(schema, self.fake.words) if schema else fake_plan_output(self.fake.words)
+        text = json.dumps(output)
+        if ":streamGenerateContent" in self.path:
+            self._stream(text, delay)
+        else:
+            time.sleep(delay)
+            self.send_json(200, self._response(text, finished=True))
+
+    def _stream(self, text: str, delay: float) -> None:
+        """Send the text as a streamed JSON array of responses, spreading the latency across chunks."""
+        size = max(1, math.ceil(len(text) / self.fake.stream_chunks))
+        pieces = [text[start:start + size] for start in range(0, len(text), size)]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for position, piece in enumerate(pieces):
+            time.sleep(delay / len(pieces))
+            prefix = b"[" if position == 0 else b","
+            self.wfile.write(prefix + json.dumps(self._response(piece, finished=position == len(pieces) - 1)).encode())
+            self.wfile.flush()
+        self.wfile.write(b"]")
+
+    @staticmethod
+    def _response(text: str, finished: bool) -> Dict:
+        candidate = {"content": {"role": "model", "parts": [{"text": text}]}}
+        response = {"candidates": [candidate]}
+        if finished:
+            candidate["finishReason"] = "STOP"
+            response["usageMetadata"] = {"promptTokenCount": 500, "candidatesTokenCount": len(text) // 4, "totalTokenCount": 500 + len(text) // 4}
+        return response
+
+
+class FakeGemini(_FakeServer):
+    """Gemini REST stand-in. `words` sets the length of every generated string field."""
+
+    def __init__(self, latency: Latency, error_rate: float = 0.0, error_status: int = 503, words: int = 12, stream_chunks: int = 20):
+        self.words = words
+        self.stream_chunks = stream_chunks
+        super().__init__(type("GeminiHandler", (_GeminiHandler,), {}), latency, error_rate, error_status)
+
+
+# --- Serper -----------------------------------------------------------------
+
+_SERPER_SITES = ["https://www.youtube.com/watch?v=", "https://medium.com/@author/", "https://dev.to/author/", "https://blog.example.com/", "https://docs.example.org/"]
+
+def fake_search_results(query: str, num: int) -> Dict[str, List[Dict]]:
+    slug = "-".join(query.lower().split())[:60]
+    return {"organic": [
+        {"title": f"{query} ({position + 1})", "link": f"{_SERPER_SITES[position % len(_SERPER_SITES)]}{slug}-{position}", "snippet": f"About {query}."}
+        for position in range(num)
+    ]}
+
+
+class _SerperHandler(_Handler):
+    fake: "FakeSerper"
+
+    def do_POST(self):
+        body = self.read_json()
+        queries = body if isinstance(body, list) else [body]
+        failed = self.fake.record_call(len(queries))
+        time.sleep(self.fake.latency.sample())
+        if failed:
+            self.send_json(self.fake.error_status, {"message": "fake upstream error"})
+            return
+        results = [fake_search_results(query.get("q", ""), int(query.get("num", 10))) for query in queries]
+        self.send_json(200, results if isinstance(body, list) else results[0])
+
+
+class FakeSerper(_FakeServer):
+    """Serper stand-in; `calls` counts queries, including each query of a batched request, and `requests` HTTP requests."""
+
+    def __init__(self, latency: Latency, error_rate: float = 0.0, error_status: int = 503):
+        super().__init__(type("SerperHandler", (_SerperHandler,), {}), latency, error_rate, error_status)
+
+    @property
+    def url(self) -> str:
+        return super().url + "/search"
@@ -0,0 +1,125 @@
+"""
+Cold-start benchmark for the SkillPath backend.
+
+Times `import backend.main` in fresh interpreters, lists the slowest modules it
+imports (from `python -X importtime`), then starts the backend against the local
+Gemini and Serper stand-ins and measures how long it takes for /health to answer
+and for /ready to report the Gemini client warm. Results are saved as JSON, in the
+same layout as benchmarks.run, so benchmarks.compare can track them across commits.
+
+    python -m benchmarks.import_time --runs 10
+    python -m benchmarks.compare benchmarks/results/old-cold-start.json benchmarks/results/new-cold-start.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.fake_upstreams import FakeGemini, FakeSerper, Latency
+from benchmarks.run import ROOT, Backend, git_revision, percentile
+
+MODULE = "backend.main"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to time the import in")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for /health and /ready")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra backend environment (repeatable)")
+    parser.add_argument("--output", type=Path, help="result file (default: benchmarks/results/<time>-<commit>-cold-start.json)")
+    return parser.parse_args(argv)
+
+def time_import(env: Dict[str, str]) -> float:
+    """Wall time of a fresh interpreter importing MODULE, minus the cost of a bare interpreter."""
+    def run(code: str) -> float:
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True)
+        return time.perf_counter() - start
+    return run(f"import {MODULE}") - run("pass")
+
+def slowest_imports(env: Dict[str, str], top: int) -> List[Tuple[str, float]]:
+    """The modules MODULE imports directly, by cumulative import time in ms (including what they import)."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {MODULE}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Two spaces of indentation per nesting level below MODULE
+        if len(name) - len(name.lstrip()) == 3:
+            modules.append((name.strip(), round(int(cumulative) / 1000, 1)))
+    return sorted(modules, key=lambda module: module[1], reverse=True)[:top]
+
+def wait_for(url: str, deadline: float) -> float:
+    """Poll a URL until it answers 200 and return the time that happened (perf_counter)."""
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"{url} did not answer 200 in time")
+
+def time_startup(backend: Backend, timeout: float) -> Dict[str, float]:
+    """Milliseconds from launching the backend until /health answers and until /ready does."""
+    start = time.perf_counter()
+    backend.start(timeout=timeout, interval=0.01)
+    healthy = time.perf_counter()
+    ready = wait_for(backend.url + "/ready", start + timeout)
+    return {"health_ms": round((healthy - start) * 1000, 1), "ready_ms": round((ready - start) * 1000, 1)}
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, object]:
+    args = parse_args(argv)
+    gemini = FakeGemini(Latency(0.05)).start()
+    serper = FakeSerper(Latency(0.05)).start()
+    backend = Backend(gemini, serper, args.env)
+
+    print(f"Timing `import {MODULE}` in {args.runs} fresh interpreters...")
+    imports = [time_import(backend.env) for _ in range(args.runs)]
+    summary: Dict[str, object] = {
+        "import_ms": {
+            name: round(value * 1000, 1)
+            for name, value in (("p50", percentile(imports, 0.50)), ("min", min(imports)), ("max", max(imports)))
+        },
+        "slowest_imports_ms": dict(slowest_imports(backend.env, args.top)),
+    }
+    print(f"  p50 {summary['import_ms']['p50']} ms, min {summary['import_ms']['min']} ms, max {summary['import_ms']['max']} ms")
+    for name, cumulative in summary["slowest_imports_ms"].items():
+        print(f"    {cumulative:>8} ms  {name}")
+
+    print("Starting the backend...")
+    try:
+        summary.update(time_startup(backend, args.timeout))
+    finally:
+        backend.stop()
+        gemini.stop()
+        serper.stop()
+    print(f"  /health after {summary['health_ms']} ms, /ready after {summary['ready_ms']} ms")
+
+    results: Dict[str, object] = {
+        **git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "scenarios": {"cold_start": summary},
+    }
+    output = args.output or ROOT / "benchmarks" / "results" / f"{time.strftime('%Y%m%d-%H%M%S')}-{results['commit'] or 'unknown'}-cold-start.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results saved to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Offline benchmark for the SkillPath backend.
+
+Starts local Gemini and Serper stand-ins, launches the backend against them in a
+subprocess, and drives /generate_plan and /get_detailed_day at a fixed
+concurrency. Reports throughput, latency percentiles, upstream call counts and
+backend memory, and saves everything as JSON for comparing runs across commits.
+
+    python -m benchmarks.run --requests 200 --concurrency 20
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.fake_upstreams import FakeGemini, FakeSerper, Latency
+
+ROOT = Path(__file__).resolve().parent.parent
+SCENARIOS = ("generate_plan", "get_detailed_day")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10, help="requests in flight at once")
+    parser.add_argument("--topics", type=int, default=0, help="distinct topics per scenario (0 = every request unique)")
+    parser.add_argument("--gemini-latency", type=float, default=2.0, help="median Gemini latency in seconds")
+    parser.add_argument("--gemini-sigma", type=float, default=0.4, help="log-normal spread of Gemini latency")
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-error-status", type=int, default=503)
+    parser.add_argument("--gemini-words", type=int, default=12, help="words per generated string field")
+    parser.add_argument("--serper-latency", type=float, default=0.3, help="median Serper latency in seconds")
+    parser.add_argument("--serper-sigma", type=float, default=0.5)
+    parser.add_argument("--serper-error-rate", type=float, default=0.0)
+    parser.add_argument("--serper-error-status", type=int, default=503)
+    parser.add_argument("--timeout", type=float, default=120, help="client timeout per request in seconds")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra backend environment (repeatable)")
+    parser.add_argument("--output", type=Path, help="result file (default: benchmarks/results/<time>-<commit>.json)")
+    return parser.parse_args(argv)
+
+def git_revision() -> Dict[str, object]:
+    def git(*args: str) -> str:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    try:
+        return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(fraction * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Current resident memory of a process from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def children_peak_rss_mb() -> float:
+    """Peak resident memory of the (exited) backend subprocess."""
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Backend:
+    """The FastAPI app under uvicorn in a child process, pointed at the fake upstreams."""
+
+    def __init__(self, gemini: FakeGemini, serper: FakeSerper, extra_env: List[str]):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = dict(os.environ)
+        self.env.update({
+            "GEMINI_API_KEY": "benchmark",
+            "GEMINI_TRANSPORT": "rest",
+            "GEMINI_API_ENDPOINT": gemini.url,
+            "SERPER_API_KEY": "benchmark",
+            "SERPER_URL": serper.url,
+            # Keep runs independent of each other and of the developer's on-disk caches
+            "LLM_CACHE_PATH": "",
+            "SERPER_CACHE_PATH": "",
+            "PLAN_STORE_PATH": "",
+            "JOB_STORE_PATH": "",
+        })
+        for item in extra_env:
+            key, _, value = item.partition("=")
+            self.env[key] = value
+        self.process: Optional[subprocess.Popen] = None
+
+    def start(self, timeout: float = 30, interval: float = 0.2) -> None:
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(self.port), "--log-level", "warning"],
+            cwd=ROOT, env=self.env, stdout=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Backend exited during startup with code {self.process.returncode}")
+            try:
+                if httpx.get(self.url + "/health", timeout=1).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            time.sleep(interval)
+        self.stop()
+        raise RuntimeError(f"Backend did not become healthy within {timeout}s")
+
+    def stop(self) -> None:
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+
+def build_payloads(scenario: str, count: int, topics: int, run_id: str) -> List[Dict]:
+    distinct = topics or count
+    payloads = []
+    for index in range(count):
+        topic = f"benchmark {run_id} topic {index % distinct}"
+        if scenario == "generate_plan":
+            payloads.append({"topic": topic})
+        else:
+            day_number = index % 7 + 1
+            payloads.append({"topic": topic, "day_topic": f"{topic} day {day_number}", "day_number": day_number})
+    return payloads
+
+async def drive(url: str, path: str, payloads: List[Dict], concurrency: int, timeout: float) -> Dict[str, object]:
+    """Send every payload with at most `concurrency` in flight; collect per-request latency and status."""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    queue: "asyncio.Queue" = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        async def worker():
+            while not queue.empty():
+                payload = queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    response = await client.post(path, json=payload)
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    ok = statuses.get("200", 0)
+    return {
+        "requests": len(payloads),
+        "succeeded": ok,
+        "statuses": statuses,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(ok / elapsed, 3) if elapsed else None,
+        "latency_ms": {
+            name: None if value is None else round(value * 1000, 1)
+            for name, value in (
+                ("p50", percentile(latencies, 0.50)),
+                ("p95", percentile(latencies, 0.95)),
+                ("p99", percentile(latencies, 0.99)),
+                ("mean", sum(latencies) / len(latencies) if latencies else None),
+                ("max", max(latencies) if latencies else None),
+            )
+        },
+    }
+
+def run_scenario(args: argparse.Namespace, backend: Backend, gemini: FakeGemini, serper: FakeSerper, scenario: str, run_id: str) -> Dict[str, object]:
+    gemini_before, serper_before = gemini.counters(), serper.counters()
+    payloads = build_payloads(scenario, args.requests, args.topics, run_id)
+    result = asyncio.run(drive(backend.url, "/" + scenario, payloads, args.concurrency, args.timeout))
+
+    gemini_after, serper_after = gemini.counters(), serper.counters()
+    result["upstream"] = {
+        "gemini_calls": gemini_after["calls"] - gemini_before["calls"],
+        "gemini_errors": gemini_after["errors"] - gemini_before["errors"],
+        "serper_queries": serper_after["calls"] - serper_before["calls"],
+        "serper_requests": serper_after["requests"] - serper_before["requests"],
+        "serper_errors": serper_after["errors"] - serper_before["errors"],
+    }
+    result["backend_rss_mb"] = rss_mb(backend.process.pid)
+    return result
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, object]:
+    args = parse_args(argv)
+    run_id = uuid.uuid4().hex[:8]
+    gemini = FakeGemini(Latency(args.gemini_latency, args.gemini_sigma), args.gemini_error_rate, args.gemini_error_status, args.gemini_words).start()
+    serper = FakeSerper(Latency(args.serper_latency, args.serper_sigma), args.serper_error_rate, args.serper_error_status).start()
+    backend = Backend(gemini, serper, args.env)
+
+    results: Dict[str, object] = {
+        **git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "scenarios": {},
+    }
+    backend.start()
+    try:
+        for scenario in args.scenarios:
+            print(f"Running {scenario}: {args.requests} requests at concurrency {args.concurrency}...")
+            results["scenarios"][scenario] = summary = run_scenario(args, backend, gemini, serper, scenario, run_id)
+            latency = summary["latency_ms"]
+            print(f"  {summary['throughput_rps']} req/s, p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms, "
+                  f"{summary['upstream']['gemini_calls']} Gemini calls, {summary['upstream']['serper_queries']} Serper queries "
+                  f"in {summary['upstream']['serper_requests']} requests")
+        results["health"] = httpx.get(backend.url + "/health", timeout=5).json()
+    finally:
+        backend.stop()
+        gemini.stop()
+        serper.stop()
+    results["backend_peak_rss_mb"] = children_peak_rss_mb()
+
+    output = args.output or ROOT / "benchmarks" / "results" / f"{time.strftime('%Y%m%d-%H%M%S')}-{results['commit'] or 'unknown'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results saved to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
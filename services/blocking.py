@@ -0,0 +1,50 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def run_blocking(coroutine: Awaitable[T]) -> T:
+    """
+    Run a coroutine for a blocking caller and wait for its result.
+
+    Every blocking caller shares one event loop on a background thread, so the sync
+    API is a thin wrapper over the async implementation and keeps its connection
+    pool and single-flight groups between calls. The coroutine runs in a copy of
+    the caller's context, so its priority and deadline apply. Must not be called
+    from that loop's own thread.
+    """
+    loop = _background_loop()
+    result: concurrent.futures.Future = concurrent.futures.Future()
+
+    def start() -> None:
+        task = loop.create_task(coroutine)
+        task.add_done_callback(lambda done: _settle(result, done))
+
+    loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+    return result.result()
+
+
+def _settle(result: concurrent.futures.Future, task: "asyncio.Task") -> None:
+    if task.cancelled():
+        result.cancel()
+    elif task.exception() is not None:
+        result.set_exception(task.exception())
+    else:
+        result.set_result(task.result())
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """The shared loop for blocking callers, started on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="blocking-loop", daemon=True).start()
+        return _loop
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class CacheEntry:
+    """A cached value together with the time it was stored."""
+
+    __slots__ = ("value", "created_at")
+
+    def __init__(self, value: Any, created_at: float):
+        self.value = value
+        self.created_at = created_at
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.age >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return [key for key, entry in self._entries.items() if entry.age < self.ttl]
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """On-disk cache tier backed by a single SQLite table of JSON values."""
+
+    EVICT_EVERY = 100
+
+    def __init__(self, path: str, table: str = "cache", max_entries: int = 100_000, ttl: float = 86400):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_created_at ON {table} (created_at)")
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if time.time() - created_at >= self.ttl:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            return CacheEntry(json.loads(value), created_at)
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(entry.value), entry.created_at),
+            )
+            # Counting rows is linear in table size, so only sweep every so often
+            self._writes += 1
+            if self._writes % self.EVICT_EVERY == 0:
+                self._evict()
+
+    def keys(self, prefix: str = "") -> List[str]:
+        """Unexpired keys starting with prefix."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key FROM {self.table} WHERE substr(key, 1, ?) = ? AND created_at >= ?",
+                (len(prefix), prefix, time.time() - self.ttl),
+            ).fetchall()
+        return [key for (key,) in rows]
+
+    def _evict(self) -> None:
+        """Drop expired rows, then the oldest rows beyond max_entries."""
+        cursor = self._conn.execute(
+            f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl,)
+        )
+        self.evictions += cursor.rowcount
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY created_at LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += cursor.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+            return count
+
+
+class TieredCache:
+    """
+    Two-tier cache: a small in-memory LRU in front of an optional SQLite store.
+    Values must be JSON-serializable. Disk hits are promoted into memory.
+
+    Entries are fresh for `ttl` seconds and are then kept for another `stale_ttl`
+    seconds, during which get() still returns them so callers can serve the stale
+    value while refreshing it (see is_stale).
+
+    Async code uses aget() and aset(): memory hits are served inline and the disk
+    tier runs on a worker thread, so SQLite never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        memory_entries: int = 1024,
+        disk_path: Optional[str] = None,
+        disk_entries: int = 100_000,
+        table: str = "cache",
+        stale_ttl: float = 0,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        lifetime = ttl + stale_ttl
+        self.memory = LRUCache(max_entries=memory_entries, ttl=lifetime)
+        self.disk = SQLiteCache(disk_path, table=table, max_entries=disk_entries, ttl=lifetime) if disk_path else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def is_stale(self, entry: CacheEntry) -> bool:
+        return entry.age >= self.ttl
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory_hits += 1
+        elif self.disk is not None:
+            entry = self._get_disk(key)
+        return self._count(entry)
+
+    async def aget(self, key: str) -> Optional[CacheEntry]:
+        """Async variant of get(); only a memory miss waits for the disk tier."""
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory_hits += 1
+        elif self.disk is not None:
+            entry = await asyncio.to_thread(self._get_disk, key)
+        return self._count(entry)
+
+    def _get_disk(self, key: str) -> Optional[CacheEntry]:
+        entry = self.disk.get(key)
+        if entry is not None:
+            self.disk_hits += 1
+            self.memory.set(key, entry)
+        return entry
+
+    def _count(self, entry: Optional[CacheEntry]) -> Optional[CacheEntry]:
+        if entry is None:
+            self.misses += 1
+        elif self.is_stale(entry):
+            self.stale_hits += 1
+        return entry
+
+    def set(self, key: str, value: Any) -> None:
+        entry = CacheEntry(value, time.time())
+        self.memory.set(key, entry)
+        if self.disk is not None:
+            self._set_disk(key, entry)
+
+    async def aset(self, key: str, value: Any) -> None:
+        """Async variant of set(); the entry is in memory (and visible to get) before the disk write starts."""
+        entry = CacheEntry(value, time.time())
+        self.memory.set(key, entry)
+        if self.disk is not None:
+            await asyncio.to_thread(self._set_disk, key, entry)
+
+    def _set_disk(self, key: str, entry: CacheEntry) -> None:
+        try:
+            self.disk.set(key, entry)
+        except sqlite3.Error as e:
+            print(f"Cache disk write failed: {e}")
+
+    def keys(self, prefix: str = "") -> List[str]:
+        """Keys of live entries in either tier that start with prefix."""
+        keys = {key for key in self.memory.keys() if key.startswith(prefix)}
+        if self.disk is not None:
+            try:
+                keys.update(self.disk.keys(prefix))
+            except sqlite3.Error as e:
+                print(f"Cache disk read failed: {e}")
+        return sorted(keys)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "memory_entries": len(self.memory),
+            "memory_evictions": self.memory.evictions,
+            "disk_entries": len(self.disk) if self.disk is not None else 0,
+            "disk_evictions": self.disk.evictions if self.disk is not None else 0,
+        }
@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional, Tuple
+from services.config import load_settings
+
+load_settings()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """A call was refused without being attempted because the provider's circuit is open."""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} is unavailable (circuit open)")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class Call:
+    """One guarded call. Set `failed` for failures that are not exceptions, such as a 5xx response."""
+    __slots__ = ("failed", "neutral")
+
+    def __init__(self):
+        self.failed = False
+        # Outcome says nothing about the provider's health (quota errors, cancelled hedges)
+        self.neutral = False
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker for one upstream provider.
+
+    Closed: calls go through and their outcomes are kept for `window` seconds.
+    Once at least `min_calls` outcomes are in the window and `failure_rate` of
+    them failed, the circuit opens. Open: calls fail immediately with
+    CircuitOpenError for `open_seconds`. Half-open: up to `half_open_calls`
+    trial calls go through; a success closes the circuit, a failure opens it
+    again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        window: float = 30,
+        min_calls: int = 10,
+        open_seconds: float = 30,
+        half_open_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.window = window
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._opened_at = 0.0
+        self._trials = 0
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    def _transition(self, state: str) -> None:
+        """Called with the lock held."""
+        if state == self.state:
+            return
+        print(f"Circuit {self.name}: {self.state} -> {state}")
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.opened += 1
+        self._outcomes.clear()
+        self._trials = 0
+
+    def retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def before_call(self) -> None:
+        """Admit a call or raise CircuitOpenError."""
+        with self._lock:
+            if self.state == OPEN:
+                if self.retry_after() > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.retry_after())
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.open_seconds)
+                self._trials += 1
+
+    def after_call(self, failed: Optional[bool]) -> None:
+        """Record an outcome; None means it does not count either way."""
+        now = time.monotonic()
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trials -= 1
+                if failed is not None:
+                    self._transition(OPEN if failed else CLOSED)
+                return
+            if failed is None or self.state != CLOSED:
+                return
+            self._outcomes.append((now, failed))
+            while self._outcomes and self._outcomes[0][0] < now - self.window:
+                self._outcomes.popleft()
+            failures = sum(1 for _, outcome in self._outcomes if outcome)
+            if len(self._outcomes) >= self.min_calls and failures >= self.failure_rate * len(self._outcomes):
+                self._transition(OPEN)
+
+    @contextmanager
+    def guard(self) -> Iterator[Call]:
+        """
+        Admit one call (or raise CircuitOpenError) and record how it went.
+        Exceptions count as failures unless the call was marked neutral.
+        """
+        self.before_call()
+        call = Call()
+        try:
+            yield call
+        except Exception:
+            call.failed = True
+            raise
+        except BaseException:
+            # Cancellation is the caller giving up, not the provider failing
+            call.neutral = True
+            raise
+        finally:
+            self.after_call(None if call.neutral else call.failed)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            failures = sum(1 for _, outcome in self._outcomes if outcome)
+            return {
+                "state": self.state,
+                "recent_calls": len(self._outcomes),
+                "recent_failures": failures,
+                "retry_after": round(self.retry_after(), 1) if self.state == OPEN else None,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+def _breaker_from_env(name: str) -> CircuitBreaker:
+    prefix = f"{name.upper()}_CIRCUIT"
+    return CircuitBreaker(
+        name,
+        failure_rate=float(os.getenv(f"{prefix}_FAILURE_RATE", "0.5")),
+        window=float(os.getenv(f"{prefix}_WINDOW", "30")),
+        min_calls=int(os.getenv(f"{prefix}_MIN_CALLS", "10")),
+        open_seconds=float(os.getenv(f"{prefix}_OPEN_SECONDS", "30")),
+        half_open_calls=int(os.getenv(f"{prefix}_HALF_OPEN_CALLS", "1")),
+    )
+
+# One breaker per upstream, shared by every caller in the process
+gemini_breaker = _breaker_from_env("gemini")
+serper_breaker = _breaker_from_env("serper")
+
+def breaker_stats() -> Dict[str, Dict[str, object]]:
+    return {breaker.name: breaker.stats() for breaker in (gemini_breaker, serper_breaker)}
+
+def any_open() -> bool:
+    return any(breaker.state != CLOSED for breaker in (gemini_breaker, serper_breaker))
@@ -0,0 +1,17 @@
+import threading
+from dotenv import load_dotenv
+
+_loaded = False
+_lock = threading.Lock()
+
+def load_settings() -> None:
+    """
+    Load the .env file into the environment, once per process.
+    Every module that reads settings at import time calls this first, so the
+    settings are the same whichever module happens to be imported first.
+    """
+    global _loaded
+    with _lock:
+        if not _loaded:
+            load_dotenv()
+            _loaded = True
@@ -0,0 +1,78 @@
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out before an upstream call finished."""
+
+    def __init__(self, provider: str):
+        super().__init__(f"Deadline exceeded waiting for {provider}")
+        self.provider = provider
+
+
+# Monotonic time by which the current request must be answered, or None for no limit
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar("request_deadline", default=None)
+
+@contextmanager
+def request_deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Give the enclosed upstream calls (including tasks started inside) `seconds` in total.
+    None or 0 leaves them unbounded; a nested budget never extends an outer one.
+    """
+    deadline = _current_deadline.get()
+    if seconds:
+        ends = time.monotonic() + seconds
+        deadline = ends if deadline is None else min(deadline, ends)
+    token = _current_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+@contextmanager
+def no_deadline() -> Iterator[None]:
+    """
+    Lift the budget for the enclosed code and the tasks started inside: for work shared by
+    several callers, each of which bounds its own wait (see within_deadline).
+    """
+    token = _current_deadline.set(None)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget (0 once it has run out), or None without a deadline."""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+def bounded(timeout: Optional[float]) -> Optional[float]:
+    """A timeout shortened to the remaining budget."""
+    left = remaining()
+    if left is None:
+        return timeout
+    return left if timeout is None else min(timeout, left)
+
+def check_deadline(provider: str) -> None:
+    """Raise DeadlineExceeded if the budget is spent, before starting a call to `provider`."""
+    if remaining() == 0:
+        raise DeadlineExceeded(provider)
+
+async def within_deadline(awaitable: Awaitable[T], provider: str) -> T:
+    """Await with the remaining budget as a timeout, raising DeadlineExceeded when it runs out."""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except DeadlineExceeded:
+        raise
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(provider)
@@ -0,0 +1,152 @@
+import json
+from typing import Any, Dict, List, Optional
+
+
+class JSONArrayStreamParser:
+    """
+    Incremental parser for a streamed top-level JSON array of objects.
+
+    Feed text chunks as they arrive; each call returns the objects that became
+    complete in that chunk. Anything before the opening '[' (such as a ```json
+    fence) is ignored. Every character is scanned once, and only the text of
+    the object currently being read is buffered. With skip_invalid, elements
+    that are balanced but not valid JSON are dropped instead of raising. An array
+    wrapped in further arrays ("[[{...}, ...]]") is read as the innermost one.
+    """
+
+    def __init__(self, skip_invalid: bool = False):
+        self.skip_invalid = skip_invalid
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._seen_element = False
+        self._buffer: List[str] = []
+
+    @property
+    def finished(self) -> bool:
+        """True once the closing ']' of the top-level array has been seen."""
+        return self._finished
+
+    def feed(self, chunk: str) -> List[Any]:
+        completed = []
+        for char in chunk:
+            if self._finished:
+                break
+            if not self._started:
+                if char == "[":
+                    self._started = True
+                continue
+
+            if self._depth > 0:
+                self._buffer.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._seen_element = True
+            elif char in "{[":
+                if self._depth == 0:
+                    if char == "[" and not self._seen_element:
+                        # The top-level array only wraps another one: read that one's elements instead
+                        continue
+                    self._buffer = [char]
+                    self._seen_element = True
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    # Closing bracket of the top-level array
+                    self._finished = True
+                    continue
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        completed.append(json.loads("".join(self._buffer)))
+                    except json.JSONDecodeError:
+                        if not self.skip_invalid:
+                            raise
+                    self._buffer = []
+        return completed
+
+
+def _scan(text: str, start: int):
+    """
+    Walk text from an opening bracket at `start`, yielding (index, char, depth)
+    for every structural character outside strings. Depth is measured after the
+    character is applied, so the matching close bracket is reported with depth 0.
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+            yield index, char, depth
+        elif char in "}]":
+            depth -= 1
+            yield index, char, depth
+        elif char == ",":
+            yield index, char, depth
+
+
+def extract_json(text: str, opener: str = "[") -> Optional[str]:
+    """
+    Return the first balanced JSON value starting with `opener`, or None if it never closes.
+    Unlike a greedy regex this stops at the matching bracket, ignoring any trailing text.
+    """
+    start = text.find(opener)
+    if start < 0:
+        return None
+    for index, char, depth in _scan(text, start):
+        if depth == 0:
+            return text[start:index + 1]
+    return None
+
+
+def recover_array_items(text: str) -> List[Any]:
+    """Return every complete, valid element of a possibly truncated top-level JSON array."""
+    return JSONArrayStreamParser(skip_invalid=True).feed(text)
+
+
+def recover_object_members(text: str) -> Dict[str, Any]:
+    """
+    Return the complete members of a possibly truncated top-level JSON object.
+    The object is cut after its last fully written member and closed.
+    """
+    start = text.find("{")
+    if start < 0:
+        return {}
+    cut = None
+    for index, char, depth in _scan(text, start):
+        if depth == 0:
+            cut = index
+            break
+        if char == "," and depth == 1:
+            cut = index
+    if cut is None:
+        return {}
+    try:
+        recovered = json.loads(text[start:cut] + "}")
+    except json.JSONDecodeError:
+        return {}
+    return recovered if isinstance(recovered, dict) else {}
@@ -1,26 +1,634 @@
 import os
+import asyncio
+import copy
 import json
 import re
-from typing import List, Dict
-from dotenv import load_dotenv
-import google.generativeai as genai
+import threading
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Iterable, List, Dict, Optional
+from pydantic import ValidationError
+from services.blocking import run_blocking
+from services.cache import TieredCache
+from services.circuit_breaker import CircuitOpenError, gemini_breaker
+from services.config import load_settings
+from services.deadline import DeadlineExceeded, no_deadline, within_deadline
+from services.json_stream import JSONArrayStreamParser, extract_json, recover_array_items, recover_object_members
+from services.metrics import count_fallback, stage
+from services.scheduler import Priority, RateLimitedError, gemini_limiter, is_rate_limit_error, request_priority
+from services.schemas import DayPlan, DetailedDayPlan, gemini_schema
+from services.singleflight import SingleFlight
+from services.topic_index import TopicIndex
 
-load_dotenv()
+if TYPE_CHECKING:
+    import google.generativeai as genai
+
+load_settings()
+
+DEFAULT_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+
+# Bump whenever a prompt changes so plans generated from the old prompt are not served
+PROMPT_VERSION = "2"
+
+PLAN_DAYS = 7
+
+# SDK transport ("grpc" by default, or "rest") and an optional endpoint override,
+# e.g. a local stand-in server for benchmarks
+GEMINI_TRANSPORT = os.getenv("GEMINI_TRANSPORT") or None
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT") or None
+
+# Constrain Gemini's output to the response schemas below (set to 0 to use free-form text)
+STRUCTURED_OUTPUT = os.getenv("GEMINI_STRUCTURED_OUTPUT", "1") != "0"
+
+PLAN_SCHEMA = gemini_schema(DayPlan, as_array=True)
+DETAILED_DAY_SCHEMA = gemini_schema(DetailedDayPlan)
+
+# Output tokens reserved against the tokens-per-minute budget before a call; corrected from actual usage afterwards
+EXPECTED_OUTPUT_TOKENS = int(os.getenv("GEMINI_EXPECTED_OUTPUT_TOKENS", "2048"))
+
+# Keys a detailed day must have; resources are filled in from Serper afterwards
+DETAILED_DAY_KEYS = [name for name in DetailedDayPlan.model_fields if name != "resources"]
+
+# Parsed plans are fresh for LLM_CACHE_TTL seconds, then served stale for up to
+# LLM_CACHE_STALE_TTL more seconds while a background refresh regenerates them.
+plan_cache = TieredCache(
+    ttl=float(os.getenv("LLM_CACHE_TTL", str(24 * 3600))),
+    stale_ttl=float(os.getenv("LLM_CACHE_STALE_TTL", str(7 * 24 * 3600))),
+    memory_entries=int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512")),
+    disk_path=os.getenv("LLM_CACHE_PATH", ".cache/skillpath.sqlite3") or None,
+    table="llm_plans",
+)
+
+# Paraphrased topics ("python data-analysis", "data analysis with Python") share
+# one cached plan when their similarity reaches TOPIC_MATCH_THRESHOLD (0-1)
+TOPIC_MATCHING = os.getenv("TOPIC_MATCHING", "1") != "0"
+topic_index = TopicIndex(threshold=float(os.getenv("TOPIC_MATCH_THRESHOLD", "0.8")))
+
+# Concurrent cache misses for the same plan share one Gemini call
+_generation_flight = SingleFlight("llm")
+
+# Plans being streamed by a generation in _generation_flight, by cache key
+_plan_streams: Dict[str, "_StreamedPlan"] = {}
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+# Strong references to background refresh tasks so the event loop does not drop them
+_background_tasks = set()
+
+def normalize_topic(text: str) -> str:
+    """Normalize a topic for cache keys: lowercase with collapsed whitespace."""
+    return " ".join(text.lower().split())
+
+def day_number_of(day: Dict) -> Optional[int]:
+    """Read the day number from a day's "Day N" label."""
+    match = re.search(r"\d+", str(day.get("day", "")))
+    return int(match.group(0)) if match else None
+
+def estimate_tokens(prompt: str) -> int:
+    """Rough token cost of a call: about four characters per prompt token plus the expected output."""
+    return len(prompt) // 4 + EXPECTED_OUTPUT_TOKENS
+
+def usage_tokens(response: Any) -> Optional[int]:
+    """Total tokens billed for a response, when Gemini reports them."""
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) or None
+
+@asynccontextmanager
+async def agemini_slot(prompt: str):
+    """
+    Hold a Gemini limiter slot for one call at the caller's priority.
+    Quota errors from the SDK are re-raised as RateLimitedError. Calls fail fast
+    with CircuitOpenError while Gemini's circuit breaker is open; other failures
+    (but not quota errors) count towards opening it.
+    """
+    with gemini_breaker.guard() as call:
+        async with gemini_limiter.aslot(tokens=estimate_tokens(prompt)) as permit:
+            try:
+                yield permit
+            except RateLimitedError:
+                call.neutral = True
+                raise
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    call.neutral = True
+                    raise RateLimitedError("gemini", f"Gemini rate limit exceeded: {e}") from e
+                raise
+
+def parse_plan_output(raw_output: str) -> List[Dict]:
+    """
+    Parse a plan array from Gemini output.
+    Falls back to recovering every complete day when the array is malformed or truncated.
+    Days that are not valid DayPlans are dropped, so they count as missing.
+    """
+    with stage("parse"):
+        json_text = extract_json(raw_output, "[")
+        if json_text is not None:
+            try:
+                plan = json.loads(json_text)
+                # Gemini occasionally wraps the days in another array
+                while len(plan) == 1 and isinstance(plan[0], list):
+                    plan = plan[0]
+                if isinstance(plan, list):
+                    return valid_days(plan)
+            except json.JSONDecodeError:
+                pass
+        count_fallback("recover_plan")
+        return valid_days(recover_array_items(raw_output))
+
+def is_valid_day(day: Any) -> bool:
+    """Whether a parsed item is a numbered day that DayPlan accepts (resources default to none; enrichment adds them)."""
+    if not isinstance(day, dict) or day_number_of(day) is None:
+        return False
+    day.setdefault("resources", [])
+    try:
+        DayPlan.model_validate(day)
+    except ValidationError:
+        return False
+    return True
+
+def valid_days(items: Iterable[Any]) -> List[Dict]:
+    days = []
+    for item in items:
+        if is_valid_day(item):
+            days.append(item)
+        elif isinstance(item, dict):
+            count_fallback("invalid_day")
+    return days
+
+def parse_object_output(raw_output: str) -> Dict:
+    """
+    Parse a JSON object from Gemini output.
+    Falls back to the fully written members when the object is malformed or truncated.
+    """
+    with stage("parse"):
+        json_text = extract_json(raw_output, "{")
+        if json_text is not None:
+            try:
+                parsed = json.loads(json_text)
+                if isinstance(parsed, dict):
+                    return parsed
+            except json.JSONDecodeError:
+                pass
+        count_fallback("recover_detailed_day")
+        return recover_object_members(raw_output)
+
+_configured_api_key = None
+_clients: Dict[str, "GeminiLLM"] = {}
+_clients_lock = threading.Lock()
+# Held while a client is created, so a request arriving during warm-up waits for it instead of duplicating it
+_create_lock = threading.Lock()
+_warm_up_thread: Optional[threading.Thread] = None
+_warm_up_error: Optional[Exception] = None
+
+def _genai():
+    """
+    The Gemini SDK, imported on first use. It pulls in gRPC and the generated
+    API types, which would otherwise make up most of the server's import time.
+    """
+    import google.generativeai as genai
+    return genai
+
+def gemini_api_key() -> str:
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("Missing GEMINI_API_KEY in environment variables.")
+    return api_key
+
+def _configure(api_key: str) -> None:
+    """Configure the Gemini SDK once per process (and again only if the key changes)."""
+    global _configured_api_key
+    with _clients_lock:
+        if _configured_api_key != api_key:
+            client_options = {"api_endpoint": GEMINI_API_ENDPOINT} if GEMINI_API_ENDPOINT else None
+            _genai().configure(api_key=api_key, transport=GEMINI_TRANSPORT, client_options=client_options)
+            _configured_api_key = api_key
+
+def get_llm(model_name: str = DEFAULT_MODEL) -> "GeminiLLM":
+    """
+    Return the shared GeminiLLM for a model, creating it on first use.
+    GenerativeModel is safe to call from several threads, so one client per model is enough.
+    """
+    llm = _clients.get(model_name)
+    if llm is None:
+        with _create_lock:
+            llm = _clients.get(model_name)
+            if llm is None:
+                llm = _clients[model_name] = GeminiLLM(model_name)
+    return llm
+
+async def aget_llm(model_name: str = DEFAULT_MODEL) -> "GeminiLLM":
+    """Async variant of get_llm(); a client still being created is waited for on a worker thread."""
+    llm = _clients.get(model_name)
+    if llm is None:
+        llm = await asyncio.to_thread(get_llm, model_name)
+    return llm
+
+def start_warm_up(model_name: str = DEFAULT_MODEL) -> None:
+    """Create the shared client on a background thread, so the SDK import happens while the server is already up."""
+    global _warm_up_thread
+    with _clients_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=_warm_up, args=(model_name,), name="llm-warm-up", daemon=True)
+            _warm_up_thread.start()
+
+def _warm_up(model_name: str) -> None:
+    global _warm_up_error
+    try:
+        get_llm(model_name)
+    except Exception as e:
+        print(f"LLM warm-up failed: {e}")
+        _warm_up_error = e
+
+def warm_up_status(model_name: str = DEFAULT_MODEL) -> Dict[str, Any]:
+    """Whether the shared client for a model is ready to serve: "ready", "warming", "failed" or "cold"."""
+    if model_name in _clients:
+        return {"status": "ready", "model": model_name}
+    if _warm_up_error is not None:
+        return {"status": "failed", "model": model_name, "error": str(_warm_up_error)}
+    return {"status": "warming" if _warm_up_thread is not None else "cold", "model": model_name}
+
+async def _athread_iter(iterable: Any) -> AsyncIterator[Any]:
+    """Iterate a blocking iterator from async code, fetching each item on a worker thread."""
+    iterator = iter(iterable)
+    done = object()
+    while True:
+        item = await asyncio.to_thread(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+def chunk_text(chunk: Any) -> str:
+    """Text of a streamed response chunk; chunks carrying only finish metadata have none."""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+def is_complete_plan(plan: List[Dict]) -> bool:
+    """Every day present and valid; only complete plans are cached."""
+    return all(is_valid_day(day) for day in plan) and {day_number_of(day) for day in plan} >= set(range(1, PLAN_DAYS + 1))
+
+def missing_day_numbers(plan: List[Dict]) -> List[int]:
+    present = {day_number_of(day) for day in plan}
+    return [number for number in range(1, PLAN_DAYS + 1) if number not in present]
+
+def merge_missing_days(plan: List[Dict], recovered: List[Dict]) -> List[Dict]:
+    """Return the days from `recovered` that fill gaps in `plan`, at most one per day number."""
+    missing = set(missing_day_numbers(plan))
+    new_days = []
+    for day in recovered:
+        number = day_number_of(day)
+        if number in missing:
+            missing.discard(number)
+            new_days.append(day)
+    return new_days
+
+def sort_plan(plan: List[Dict]) -> List[Dict]:
+    return sorted(plan, key=lambda day: day_number_of(day) or 0)
+
+def missing_detailed_day_keys(detailed_plan: Dict) -> List[str]:
+    return [key for key in DETAILED_DAY_KEYS if key not in detailed_plan]
+
+def missing_fields_schema(missing: List[str]) -> Dict:
+    return {
+        "type": "object",
+        "properties": {key: DETAILED_DAY_SCHEMA["properties"][key] for key in missing},
+        "required": missing,
+    }
+
+class _StreamedPlan:
+    """
+    The days of a plan that one generation is streaming. Every request waiting on
+    that generation replays them: the days written so far at once, the rest as
+    they arrive.
+    """
+
+    def __init__(self):
+        self.days: List[Dict] = []
+        self.finished = False
+        self._changed = asyncio.Event()
+
+    def publish(self, day: Dict) -> None:
+        self.days.append(day)
+        self._notify()
+
+    def finish(self) -> None:
+        self.finished = True
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def replay(self, generation: "asyncio.Future") -> AsyncIterator[Dict]:
+        """Yield copies of the days in order, then raise the generation's error if it failed."""
+        sent = 0
+        while True:
+            while sent < len(self.days):
+                yield copy.deepcopy(self.days[sent])
+                sent += 1
+            if self.finished:
+                break
+            await self._changed.wait()
+        await asyncio.shield(generation)
 
 class GeminiLLM:
-    """Wrapper for Google Gemini model calls"""
+    """
+    Wrapper for Google Gemini model calls.
+    The generators are async (prefixed with "a"); generate_learning_plan and
+    generate_detailed_day_plan are blocking wrappers around them for sync callers.
+    """
     
-    def __init__(self, model_name: str = "gemini-2.0-flash"):
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            raise ValueError("Missing GEMINI_API_KEY in environment variables.")
+    def __init__(self, model_name: str = DEFAULT_MODEL):
+        self.api_key = gemini_api_key()
         
-        genai.configure(api_key=self.api_key)
-        self.client = genai.GenerativeModel(model_name)
+        _configure(self.api_key)
+        self.model_name = model_name
+        self.client = _genai().GenerativeModel(model_name)
+        if TOPIC_MATCHING:
+            self._seed_topic_index()
+
+    def _cache_key(self, kind: str, *parts: Any) -> str:
+        return "|".join([PROMPT_VERSION, self.model_name, kind] + [str(part) for part in parts])
+
+    def _plan_key(self, topic: str) -> str:
+        return self._cache_key("plan", self._plan_topic(topic))
+
+    def _plan_topic(self, topic: str) -> str:
+        """
+        The topic a plan is cached under: an earlier near-duplicate phrasing when
+        the topic index has one, otherwise this topic, indexed for later requests.
+        Indexing before generation also lets concurrent paraphrases share one call.
+        """
+        normalized = normalize_topic(topic)
+        if not TOPIC_MATCHING:
+            return normalized
+        matched = topic_index.match(normalized)
+        if matched is None:
+            topic_index.add(normalized)
+            return normalized
+        return matched
+
+    def _seed_topic_index(self) -> None:
+        """Index the topics of plans already in the cache, e.g. on disk from an earlier run."""
+        prefix = self._cache_key("plan", "")
+        for key in plan_cache.keys(prefix):
+            topic_index.add(key[len(prefix):])
+
+    def _day_key(self, topic: str, day_topic: str, day_number: int) -> str:
+        return self._cache_key("day", normalize_topic(topic), normalize_topic(day_topic), day_number)
+
+    # --- Public API -------------------------------------------------------
 
     def generate_learning_plan(self, topic: str) -> List[Dict]:
+        """Blocking wrapper for agenerate_learning_plan."""
+        return run_blocking(self.agenerate_learning_plan(topic))
+
+    def generate_detailed_day_plan(self, topic: str, day_topic: str, day_number: int) -> Dict:
+        """Blocking wrapper for agenerate_detailed_day_plan."""
+        return run_blocking(self.agenerate_detailed_day_plan(topic, day_topic, day_number))
+
+    async def agenerate_learning_plan(self, topic: str) -> List[Dict]:
+        """
+        Generate a structured 7-day plan for the given topic, served from the plan cache when possible.
+        Gives up with DeadlineExceeded when the request's budget runs out; the
+        shared generation keeps running and still fills the cache.
+        """
+        generation = self._acached(self._plan_key(topic), lambda: self._agenerate_learning_plan(topic), is_complete_plan)
+        return await within_deadline(generation, "gemini")
+
+    async def agenerate_detailed_day_plan(self, topic: str, day_topic: str, day_number: int) -> Dict:
+        """
+        Generate a detailed plan for a specific day, served from the plan cache when possible.
+        Bounded by the request's budget like agenerate_learning_plan.
+        """
+        key = self._day_key(topic, day_topic, day_number)
+        generation = self._acached(key, lambda: self._agenerate_detailed_day_plan(topic, day_topic, day_number))
+        return await within_deadline(generation, "gemini")
+
+    async def astream_learning_plan(self, topic: str) -> AsyncIterator[Dict]:
+        """
+        Yield the days of a 7-day plan one by one as Gemini writes them.
+        Cached plans are replayed immediately; a freshly streamed plan is cached once complete.
+        Concurrent requests for the same plan share one streamed generation: the first
+        one starts it, and the others replay its days as they arrive.
+        """
+        key = self._plan_key(topic)
+        entry = await plan_cache.aget(key)
+        if entry is not None:
+            if plan_cache.is_stale(entry):
+                self._arefresh_in_background(key, lambda: self._agenerate_learning_plan(topic), is_complete_plan)
+            for day in copy.deepcopy(entry.value):
+                yield day
+            return
+        
+        stream = _StreamedPlan()
+        generation, leader = _generation_flight.astart(key, lambda: self._astream_generation(topic, key, stream))
+        if leader:
+            _plan_streams[key] = stream
+        else:
+            stream = _plan_streams.get(key)
+        if stream is None:
+            # Another request is generating this plan without streaming it: wait for the whole plan
+            for day in copy.deepcopy(await asyncio.shield(generation)):
+                yield day
+            return
+        
+        async for day in stream.replay(generation):
+            yield day
+
+    async def _astream_generation(self, topic: str, key: str, stream: _StreamedPlan) -> List[Dict]:
+        """Stream a plan from Gemini into `stream`, fill in missing days and cache it. Returns the sorted plan."""
+        try:
+            parser = JSONArrayStreamParser(skip_invalid=True)
+            prompt = self._learning_plan_prompt(topic)
+            try:
+                async with agemini_slot(prompt) as permit:
+                    with stage("llm_stream"):
+                        response = await self._agenerate_content(prompt, self._json_config(PLAN_SCHEMA), stream=True)
+                        async for chunk in response:
+                            permit.tokens_used = usage_tokens(chunk) or permit.tokens_used
+                            for day in valid_days(parser.feed(chunk_text(chunk))):
+                                stream.publish(day)
+            except (RateLimitedError, DeadlineExceeded, CircuitOpenError):
+                raise
+            except Exception as e:
+                raise RuntimeError(f"Gemini failed to stream a learning plan: {e}")
+            
+            if not stream.days:
+                raise RuntimeError("Gemini failed to stream a learning plan: no JSON array found in output.")
+            
+            for day in await self._agenerate_missing_days(topic, stream.days):
+                stream.publish(day)
+            plan = sort_plan(stream.days)
+            if is_complete_plan(plan):
+                await plan_cache.aset(key, plan)
+            return plan
+        finally:
+            stream.finish()
+            if _plan_streams.get(key) is stream:
+                del _plan_streams[key]
+
+    # --- Plan cache -------------------------------------------------------
+
+    async def _acached(self, key: str, generate: Callable[[], Awaitable[Any]], is_complete: Callable[[Any], bool] = lambda value: True) -> Any:
+        """
+        Serve a parsed plan from the cache, generating it on a miss.
+        Stale entries are returned immediately and refreshed in a background task.
+        Results failing is_complete (e.g. a partially recovered plan) are returned but not cached.
+        Concurrent misses for the same key wait on a single generation.
+        Callers get a deep copy because the endpoints rewrite resources in place.
+        """
+        entry = await plan_cache.aget(key)
+        if entry is None:
+            async def generate_and_store():
+                value = await generate()
+                if is_complete(value):
+                    await plan_cache.aset(key, value)
+                return value
+            return copy.deepcopy(await _generation_flight.ado(key, generate_and_store))
+        
+        if plan_cache.is_stale(entry):
+            self._arefresh_in_background(key, generate, is_complete)
+        return copy.deepcopy(entry.value)
+
+    @staticmethod
+    def _claim_refresh(key: str) -> bool:
+        """Mark key as refreshing; False if a refresh is already running."""
+        with _refreshing_lock:
+            if key in _refreshing:
+                return False
+            _refreshing.add(key)
+            return True
+
+    @staticmethod
+    def _release_refresh(key: str) -> None:
+        with _refreshing_lock:
+            _refreshing.discard(key)
+
+    def _arefresh_in_background(self, key: str, generate: Callable[[], Awaitable[Any]], is_complete: Callable[[Any], bool] = lambda value: True) -> None:
+        if not self._claim_refresh(key):
+            return
+        
+        async def refresh():
+            try:
+                with request_priority(Priority.BACKGROUND):
+                    value = await generate()
+                if is_complete(value):
+                    await plan_cache.aset(key, value)
+            except Exception as e:
+                print(f"Background refresh failed for {key}: {e}")
+            finally:
+                self._release_refresh(key)
+        
+        # Refreshes outlive the request that noticed the stale entry, so they do not inherit its budget
+        with no_deadline():
+            task = asyncio.get_running_loop().create_task(refresh())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    # --- Gemini calls -----------------------------------------------------
+
+    def _json_config(self, schema: Dict) -> Optional["genai.GenerationConfig"]:
+        """Generation config constraining output to a JSON schema, or None in free-form mode."""
+        if not STRUCTURED_OUTPUT:
+            return None
+        return _genai().GenerationConfig(response_mime_type="application/json", response_schema=schema)
+
+    async def _agenerate_content(self, prompt: str, generation_config: Any, stream: bool = False) -> Any:
+        """
+        generate_content_async, except with the REST transport: the SDK has no async
+        REST client, so the blocking call (and stream iteration) runs on worker threads.
+        """
+        if GEMINI_TRANSPORT != "rest":
+            return await self.client.generate_content_async(prompt, generation_config=generation_config, stream=stream)
+        response = await asyncio.to_thread(self.client.generate_content, prompt, generation_config=generation_config, stream=stream)
+        return _athread_iter(response) if stream else response
+
+    async def _acall(self, prompt: str, schema: Dict) -> str:
+        async with agemini_slot(prompt) as permit:
+            with stage("llm"):
+                response = await self._agenerate_content(prompt, self._json_config(schema))
+            permit.tokens_used = usage_tokens(response)
+        return response.text
+
+    async def _agenerate_learning_plan(self, topic: str) -> List[Dict]:
         """Generate a structured 7-day plan for the given topic using Gemini."""
-        prompt = f"""
+        try:
+            raw_output = await self._acall(self._learning_plan_prompt(topic), PLAN_SCHEMA)
+        except (RateLimitedError, DeadlineExceeded, CircuitOpenError):
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Gemini failed to generate a learning plan: {e}")
+        
+        plan = self._parse_plan(raw_output)
+        plan.extend(await self._agenerate_missing_days(topic, plan))
+        return sort_plan(plan)
+
+    @staticmethod
+    def _parse_plan(raw_output: str) -> List[Dict]:
+        plan = parse_plan_output(raw_output)
+        if not plan:
+            raise RuntimeError(f"Failed to parse JSON: no complete days found.\nRaw output:\n{raw_output[:1000]}")
+        return plan
+
+    async def _agenerate_missing_days(self, topic: str, plan: List[Dict]) -> List[Dict]:
+        """
+        Ask Gemini for only the days absent from a partially recovered plan.
+        Returns the new days; any still missing afterwards are left out.
+        """
+        missing = missing_day_numbers(plan)
+        if not missing:
+            return []
+        
+        print(f"Recovered {len(plan)} of {PLAN_DAYS} days for '{topic}', requesting days {missing}")
+        count_fallback("missing_days")
+        try:
+            raw_output = await self._acall(self._missing_days_prompt(topic, plan, missing), PLAN_SCHEMA)
+        except Exception as e:
+            print(f"Gemini failed to generate missing days {missing} for '{topic}': {e}")
+            return []
+        return merge_missing_days(plan, parse_plan_output(raw_output))
+
+    async def _agenerate_detailed_day_plan(self, topic: str, day_topic: str, day_number: int) -> Dict:
+        """Generate a detailed, comprehensive plan for a specific day"""
+        prompt = self._detailed_day_prompt(topic, day_topic, day_number)
+        try:
+            raw_output = await self._acall(prompt, DETAILED_DAY_SCHEMA)
+        except (RateLimitedError, DeadlineExceeded, CircuitOpenError):
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Gemini failed to generate detailed day plan: {e}")
+        
+        detailed_plan = parse_object_output(raw_output)
+        missing = missing_detailed_day_keys(detailed_plan)
+        if missing and detailed_plan:
+            detailed_plan.update(await self._agenerate_missing_fields(prompt, detailed_plan, missing))
+        return self._finish_detailed_day(detailed_plan, raw_output)
+
+    @staticmethod
+    def _finish_detailed_day(detailed_plan: Dict, raw_output: str) -> Dict:
+        missing = missing_detailed_day_keys(detailed_plan)
+        if missing:
+            raise RuntimeError(f"Failed to parse detailed day JSON: missing {missing}\nRaw output:\n{raw_output[:1000]}")
+        detailed_plan.setdefault("resources", [])
+        return detailed_plan
+
+    async def _agenerate_missing_fields(self, prompt: str, partial: Dict, missing: List[str]) -> Dict:
+        """Ask Gemini for only the fields absent from a partially recovered detailed day."""
+        print(f"Recovered {len(partial)} fields of {partial.get('day')}, requesting {missing}")
+        count_fallback("missing_fields")
+        try:
+            raw_output = await self._acall(self._missing_fields_prompt(prompt, partial, missing), missing_fields_schema(missing))
+        except Exception as e:
+            print(f"Gemini failed to generate missing fields {missing}: {e}")
+            return {}
+        return {key: value for key, value in parse_object_output(raw_output).items() if key in missing}
+
+    # --- Prompts ----------------------------------------------------------
+
+    def _learning_plan_prompt(self, topic: str) -> str:
+        return f"""
 You are an expert learning designer.
 
 Generate a structured **7-day learning plan** for the topic: "{topic}".
@@ -43,34 +651,35 @@ For each day, return a clear and valid JSON array with this structure:
 Only return valid JSON — do not include explanations, markdown or text outside JSON.
         """
 
-        try:
-            response = self.client.generate_content(prompt)
-            raw_output = response.text.strip()
-
-            # Remove ```json or ``` and ``` wrappers if present
-            raw_output = re.sub(r"^```(json)?", "", raw_output)
-            raw_output = re.sub(r"```$", "", raw_output)
-            raw_output = raw_output.strip()
-
-            # Extract first valid JSON array using regex
-            match = re.search(r"\[.*\]", raw_output, re.DOTALL)
-            if not match:
-                raise ValueError("No JSON array found in Gemini output.")
-            
-            json_text = match.group(0).strip()
+    def _missing_days_prompt(self, topic: str, plan: List[Dict], missing: List[int]) -> str:
+        planned = "\n".join(f"{day.get('day')}: {day.get('topic')}" for day in plan)
+        wanted = ", ".join(f"Day {number}" for number in missing)
+        return f"""
+You are an expert learning designer.
 
-            # Parse safely 
-            plan = json.loads(json_text)
-            return plan
+A structured **7-day learning plan** for the topic "{topic}" is being written.
+These days are already planned:
+{planned}
 
-        except json.JSONDecodeError as e:
-            raise RuntimeError(f"Failed to parse JSON: {e}\nRaw output:\n{raw_output[:1000]}")
-        except Exception as e:
-            raise RuntimeError(f"Gemini failed to generate a learning plan: {e}")
+Generate ONLY the missing days: {wanted}. They must fit around the days above.
 
-    def generate_detailed_day_plan(self, topic: str, day_topic: str, day_number: int) -> Dict:
-        """Generate a detailed, comprehensive plan for a specific day"""
-        prompt = f"""
+Return a valid JSON array containing only those days, each with this structure:
+{{
+  "day": "Day N",
+  "topic": "<subtopic title>",
+  "mini_challenge": "<short hands-on task>",
+  "reasoning": "<why this topic is on this day>",
+  "resources": [
+    {{ "type": "YouTube", "title": "<video title>", "url": "<link>" }},
+    {{ "type": "Blog", "title": "<blog title>", "url": "<link>" }},
+    {{ "type": "Article", "title": "<article title>", "url": "<link>" }}
+  ]
+}}
+Only return valid JSON — do not include explanations, markdown or text outside JSON.
+        """
+
+    def _detailed_day_prompt(self, topic: str, day_topic: str, day_number: int) -> str:
+        return f"""
 You are an expert learning designer and instructor.
 
 Generate a COMPREHENSIVE and DETAILED learning plan for Day {day_number} of learning "{topic}".
@@ -116,25 +725,11 @@ Return a detailed JSON object with this EXACT structure:
 Only return valid JSON — no explanations, markdown, or text outside JSON.
         """
 
-        try:
-            response = self.client.generate_content(prompt)
-            raw_output = response.text.strip()
-
-            # Remove ```json or ``` wrappers if present
-            raw_output = re.sub(r"^```(json)?", "", raw_output)
-            raw_output = re.sub(r"```$", "", raw_output)
-            raw_output = raw_output.strip()
-
-            # Extract JSON object
-            match = re.search(r"\{.*\}", raw_output, re.DOTALL)
-            if not match:
-                raise ValueError("No JSON object found in Gemini output.")
-            
-            json_text = match.group(0).strip()
-            detailed_plan = json.loads(json_text)
-            return detailed_plan
+    def _missing_fields_prompt(self, prompt: str, partial: Dict, missing: List[str]) -> str:
+        return f"""{prompt}
+The following part of the JSON object has already been written:
+{json.dumps(partial, indent=2)}
 
-        except json.JSONDecodeError as e:
-            raise RuntimeError(f"Failed to parse detailed day JSON: {e}\nRaw output:\n{raw_output[:1000]}")
-        except Exception as e:
-            raise RuntimeError(f"Gemini failed to generate detailed day plan: {e}")
+Return a JSON object containing ONLY these remaining keys: {", ".join(missing)}.
+Only return valid JSON — no explanations, markdown, or text outside JSON.
+        """
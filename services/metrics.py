@@ -0,0 +1,183 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, spanning a cached lookup to a slow Gemini generation
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Payload size buckets in bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Every metric created in the process, in registration order, for /metrics
+_registry: List["_Metric"] = []
+
+# (stage, seconds) pairs recorded while handling the current request, or None outside one
+_request_timings: contextvars.ContextVar = contextvars.ContextVar("request_timings", default=None)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter, one series per label combination."""
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}" for labels, value in values]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((labels, [list(counts), total, count]) for labels, (counts, total, count) in self._series.items())
+        lines = []
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_number(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("skillpath_stage_seconds", "Time spent in each processing stage.", ["stage"])
+STAGE_ERRORS = Counter("skillpath_stage_errors_total", "Stages that ended with an exception.", ["stage"])
+FALLBACKS = Counter("skillpath_fallbacks_total", "Times a degraded fallback path was taken.", ["kind"])
+REQUEST_SECONDS = Histogram("skillpath_request_seconds", "End-to-end HTTP request latency.", ["method", "path", "status"])
+REQUEST_BYTES = Histogram("skillpath_request_bytes", "HTTP request body size.", ["path"], buckets=SIZE_BUCKETS)
+RESPONSE_BYTES = Histogram("skillpath_response_bytes", "HTTP response body size.", ["path"], buckets=SIZE_BUCKETS)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time the enclosed block as a processing stage.
+    Records the stage histogram, counts the stage as an error if it raises, and
+    adds the timing to the current request's Server-Timing breakdown.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+def count_fallback(kind: str) -> None:
+    FALLBACKS.inc(kind)
+
+@contextmanager
+def track_request() -> Iterator[List[Tuple[str, float]]]:
+    """
+    Collect the stage timings of one request. Tasks started inside share the
+    same list because they copy the current context; threads do not.
+    """
+    timings: List[Tuple[str, float]] = []
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+def summarize_timings(timings: List[Tuple[str, float]]) -> Dict[str, Tuple[float, int]]:
+    """Total seconds and call count per stage, in first-seen order."""
+    summary: Dict[str, Tuple[float, int]] = {}
+    for name, elapsed in list(timings):
+        total, count = summary.get(name, (0.0, 0))
+        summary[name] = (total + elapsed, count + 1)
+    return summary
+
+def server_timing(timings: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """
+    Format stage timings as a Server-Timing header value. Stages run concurrently
+    (such as Serper queries) report their summed duration, with the call count as the description.
+    """
+    entries = []
+    for name, (elapsed, count) in summarize_timings(timings).items():
+        entry = f"{name};dur={elapsed * 1000:.1f}"
+        if count > 1:
+            entry += f';desc="{count} calls"'
+        entries.append(entry)
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+def render_prometheus() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,260 @@
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from services.topic_index import content_words
+
+# Type labels, decided once per URL when a result is indexed
+YOUTUBE = "YouTube"
+DOCUMENTATION = "Documentation"
+ARTICLE = "Article"
+BLOG = "Blog"
+RESOURCE = "Resource"
+
+_ARTICLE_SITES = ("medium.com", "dev.to", "towardsdatascience.com")
+_DOC_MARKERS = ("docs.", "/docs", "documentation", "readthedocs", "official")
+
+def classify_url(url: str) -> str:
+    """Resource type label for a URL."""
+    lowered = (url or "").lower()
+    if "youtube.com" in lowered or "youtu.be" in lowered:
+        return YOUTUBE
+    if any(marker in lowered for marker in _DOC_MARKERS):
+        return DOCUMENTATION
+    if any(site in lowered for site in _ARTICLE_SITES) or "article" in lowered:
+        return ARTICLE
+    if "blog" in lowered:
+        return BLOG
+    return RESOURCE
+
+def url_key(url: str) -> str:
+    """Canonical form of a URL for de-duplication: no scheme, www., fragment, tracking parameters or trailing slash."""
+    parts = urlsplit((url or "").strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode([(key, value) for key, value in parse_qsl(parts.query) if not key.startswith("utm_")])
+    return f"{host}{parts.path.rstrip('/')}" + (f"?{query}" if query else "")
+
+def tokenize(text: str) -> List[str]:
+    """Stemmed content words of a text, with repeats (term frequency matters for BM25)."""
+    return content_words(text)
+
+
+class _Document:
+    __slots__ = ("resource", "terms", "length", "indexed_at")
+
+    def __init__(self, resource: Dict, indexed_at: float):
+        self.resource = resource
+        self.terms = Counter(tokenize(f"{resource.get('title') or ''} {resource.get('snippet') or ''}"))
+        self.length = sum(self.terms.values())
+        self.indexed_at = indexed_at
+
+
+class ResourceIndex:
+    """
+    Local search index over every resource Serper has returned.
+
+    An inverted index over title and snippet, ranked with BM25. Resources are
+    de-duplicated by canonical URL (re-indexing refreshes them) and carry a type
+    label computed once from the URL. A hit must contain at least `min_coverage`
+    of the query's terms and be younger than `max_age` seconds, so callers can
+    treat an empty result as "go ask Serper". With a path, resources are also
+    kept in SQLite and reloaded on startup; async code indexes with aadd(), which
+    writes SQLite on a worker thread. The table is pruned to the same age and size
+    limits every PRUNE_EVERY writes.
+    """
+
+    PRUNE_EVERY = 100
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_age: float = 7 * 24 * 3600,
+        max_documents: int = 50_000,
+        min_coverage: float = 0.75,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.max_age = max_age
+        self.max_documents = max_documents
+        self.min_coverage = min_coverage
+        self.k1 = k1
+        self.b = b
+        self._documents: Dict[str, _Document] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.pruned = 0
+
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS resources ("
+                "url_key TEXT PRIMARY KEY, url TEXT NOT NULL, title TEXT, snippet TEXT, "
+                "type TEXT NOT NULL, indexed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS resources_indexed_at ON resources (indexed_at)")
+            self._load()
+
+    def _load(self) -> None:
+        rows = self._conn.execute(
+            "SELECT url_key, url, title, snippet, type, indexed_at FROM resources "
+            "WHERE indexed_at >= ? ORDER BY indexed_at DESC LIMIT ?",
+            (time.time() - self.max_age, self.max_documents),
+        ).fetchall()
+        with self._lock:
+            for key, url, title, snippet, label, indexed_at in reversed(rows):
+                self._insert(key, {"type": label, "title": title, "url": url, "snippet": snippet}, indexed_at)
+
+    # --- Writes -------------------------------------------------------------
+
+    def add(self, resources: Iterable[Dict]) -> None:
+        """Index resources (dicts with title, url, snippet), labelling each by URL."""
+        self._persist(self._index(resources))
+
+    async def aadd(self, resources: Iterable[Dict]) -> None:
+        """Async variant of add(); the resources are searchable before the SQLite write starts."""
+        rows = self._index(resources)
+        if self._conn is not None and rows:
+            await asyncio.to_thread(self._persist, rows)
+
+    def _index(self, resources: Iterable[Dict]) -> List[tuple]:
+        """Add resources to the in-memory index; returns their rows for SQLite."""
+        now = time.time()
+        rows = []
+        with self._lock:
+            for resource in resources:
+                if not resource.get("url"):
+                    continue
+                key = url_key(resource["url"])
+                entry = {
+                    "type": classify_url(resource["url"]),
+                    "title": resource.get("title"),
+                    "url": resource["url"],
+                    "snippet": resource.get("snippet"),
+                }
+                self._insert(key, entry, now)
+                rows.append((key, entry["url"], entry["title"], entry["snippet"], entry["type"], now))
+            while len(self._documents) > self.max_documents:
+                self._remove(next(iter(self._documents)))
+        return rows
+
+    def _persist(self, rows: List[tuple]) -> None:
+        if self._conn is None or not rows:
+            return
+        with self._db_lock:
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO resources VALUES (?, ?, ?, ?, ?, ?)", rows)
+                # Counting rows is linear in table size, so only prune every so often
+                self._writes += 1
+                if self._writes % self.PRUNE_EVERY == 0:
+                    self._prune()
+            except sqlite3.Error as e:
+                print(f"Resource index write failed: {e}")
+
+    def _prune(self) -> None:
+        """Drop rows older than max_age, then the oldest rows beyond max_documents, as SQLiteCache._evict does."""
+        cursor = self._conn.execute("DELETE FROM resources WHERE indexed_at < ?", (time.time() - self.max_age,))
+        self.pruned += cursor.rowcount
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM resources").fetchone()
+        overflow = count - self.max_documents
+        if overflow > 0:
+            cursor = self._conn.execute(
+                "DELETE FROM resources WHERE url_key IN "
+                "(SELECT url_key FROM resources ORDER BY indexed_at LIMIT ?)",
+                (overflow,),
+            )
+            self.pruned += cursor.rowcount
+
+    def _insert(self, key: str, resource: Dict, indexed_at: float) -> None:
+        """Called with the lock held. Re-inserting a URL replaces it and moves it to the newest position."""
+        self._remove(key)
+        document = _Document(resource, indexed_at)
+        self._documents[key] = document
+        self._total_length += document.length
+        for term, frequency in document.terms.items():
+            self._postings.setdefault(term, {})[key] = frequency
+
+    def _remove(self, key: str) -> None:
+        document = self._documents.pop(key, None)
+        if document is None:
+            return
+        self._total_length -= document.length
+        for term in document.terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+
+    # --- Queries ------------------------------------------------------------
+
+    def search(self, query: str, limit: int = 10, types: Optional[Iterable[str]] = None, exclude_urls: Iterable[str] = ()) -> List[Dict]:
+        """
+        Fresh resources matching the query, best BM25 score first, as copies.
+        `types` restricts the type labels; `exclude_urls` skips resources already chosen.
+        """
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return []
+        allowed = set(types) if types is not None else None
+        excluded = {url_key(url) for url in exclude_urls}
+        oldest = time.time() - self.max_age
+        needed = math.ceil(self.min_coverage * len(query_terms))
+
+        with self._lock:
+            count = len(self._documents)
+            if not count:
+                return []
+            average_length = self._total_length / count
+            scores: Dict[str, float] = {}
+            matched: Counter = Counter()
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, frequency in postings.items():
+                    length = self._documents[key].length
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * (self.k1 + 1) / (
+                        frequency + self.k1 * (1 - self.b + self.b * length / average_length)
+                    )
+                    matched[key] += 1
+
+            ranked = []
+            for key, score in scores.items():
+                document = self._documents[key]
+                if matched[key] < needed or document.indexed_at < oldest or key in excluded:
+                    continue
+                if allowed is not None and document.resource["type"] not in allowed:
+                    continue
+                ranked.append((score, key))
+            ranked.sort(reverse=True)
+            return [dict(self._documents[key].resource) for _, key in ranked[:limit]]
+
+    def record_lookup(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"documents": len(self._documents), "terms": len(self._postings), "hits": self.hits, "misses": self.misses, "pruned": self.pruned}
+
+    def __len__(self) -> int:
+        return len(self._documents)
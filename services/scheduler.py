@@ -0,0 +1,340 @@
+import os
+import asyncio
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from enum import IntEnum
+from typing import Dict, Iterator, List, Optional, Union
+from services.config import load_settings
+
+load_settings()
+
+
+class Priority(IntEnum):
+    """Scheduling classes; lower values are admitted first."""
+    INTERACTIVE = 0
+    BULK = 1
+    BACKGROUND = 2
+
+
+class RateLimitedError(RuntimeError):
+    """An upstream provider rejected a call for exceeding its quota (HTTP 429)."""
+
+    def __init__(self, provider: str, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class SharedPriority:
+    """
+    A priority that can be raised while calls made under it are already waiting
+    for admission, e.g. when a user claims a background prefetch. Waiting calls
+    move up the queue at once, and later calls start at the new priority.
+    """
+
+    def __init__(self, priority: Priority):
+        self.priority = priority
+
+    def raise_to(self, priority: Priority) -> None:
+        if priority >= self.priority:
+            return
+        self.priority = priority
+        for limiter in _limiters:
+            limiter.reprioritize()
+
+
+PriorityLike = Union[Priority, SharedPriority]
+
+_current_priority: contextvars.ContextVar = contextvars.ContextVar("upstream_priority", default=Priority.BULK)
+
+@contextmanager
+def request_priority(priority: PriorityLike) -> Iterator[None]:
+    """Run the enclosed upstream calls (including tasks started inside) at the given priority."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+def resolve_priority(priority: PriorityLike) -> Priority:
+    return priority.priority if isinstance(priority, SharedPriority) else priority
+
+def current_priority() -> Priority:
+    return resolve_priority(_current_priority.get())
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Recognize quota errors from the Gemini SDK (ResourceExhausted) or an HTTP 429."""
+    if isinstance(error, RateLimitedError):
+        return True
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests"):
+        return True
+    return getattr(error, "code", None) == 429
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second up to `capacity`. Not thread-safe on its own."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """Charge (positive) or refund (negative) tokens after the fact, e.g. once real usage is known."""
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class Permit:
+    """Admission to make one upstream call. Set rate_limited if the call came back with a 429."""
+
+    __slots__ = ("priority", "tokens", "tokens_used", "rate_limited", "started")
+
+    def __init__(self, priority: Priority, tokens: float):
+        self.priority = priority
+        self.tokens = tokens
+        self.tokens_used: Optional[float] = None
+        self.rate_limited = False
+        self.started = time.monotonic()
+
+
+class _Waiter:
+    __slots__ = ("_priority", "seq", "event", "loop")
+
+    def __init__(self, priority: PriorityLike, seq: int, loop: Optional[asyncio.AbstractEventLoop]):
+        self._priority = priority
+        self.seq = seq
+        self.loop = loop
+        self.event = asyncio.Event() if loop is not None else threading.Event()
+
+    @property
+    def priority(self) -> Priority:
+        """Re-read on every comparison, since a SharedPriority may have been raised since the waiter arrived."""
+        return resolve_priority(self._priority)
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def wake(self) -> None:
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.event.set)
+        else:
+            self.event.set()
+
+
+# Every limiter in the process, re-ordered when a SharedPriority is raised
+_limiters: List["ProviderLimiter"] = []
+
+
+class ProviderLimiter:
+    """
+    Admission control for one upstream provider.
+
+    A call is admitted when it is the highest-priority waiter, the adaptive
+    concurrency limit has room, and the request (and, optionally, token)
+    buckets can pay for it. The concurrency limit follows AIMD: it grows by
+    roughly one per limit's worth of fast successes, shrinks a little when
+    latency exceeds the target, and halves on every 429. Works from both
+    threads (slot) and coroutines (aslot).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float,
+        max_concurrency: int,
+        tokens_per_minute: Optional[float] = None,
+        min_concurrency: int = 1,
+        target_latency: float = 10.0,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.target_latency = target_latency
+        self.limit = float(max_concurrency)
+        self.inflight = 0
+        self.requests = TokenBucket(requests_per_minute / 60, max(1.0, requests_per_minute / 10))
+        self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute else None
+        self.admitted: Dict[str, int] = {priority.name.lower(): 0 for priority in Priority}
+        self.rate_limited = 0
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        _limiters.append(self)
+
+    # --- Admission ----------------------------------------------------------
+
+    def _try_admit(self, waiter: _Waiter, tokens: float) -> Optional[float]:
+        """
+        Called with the lock held. Returns None once the waiter is admitted,
+        otherwise the seconds to wait before re-checking (0 means until woken).
+        """
+        if self._waiters[0] is not waiter or self.inflight >= int(self.limit):
+            return 0.0
+        delay = self.requests.delay_for(1)
+        if self.tokens is not None and tokens:
+            delay = max(delay, self.tokens.delay_for(tokens))
+        if delay > 0:
+            return delay
+
+        self.requests.take(1)
+        if self.tokens is not None and tokens:
+            self.tokens.take(tokens)
+        heapq.heappop(self._waiters)
+        self.inflight += 1
+        self.admitted[waiter.priority.name.lower()] += 1
+        self._wake_head()
+        return None
+
+    def _wake_head(self) -> None:
+        if self._waiters and self.inflight < int(self.limit):
+            self._waiters[0].wake()
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+            self._wake_head()
+
+    def reprioritize(self) -> None:
+        """Restore the waiters' order after a SharedPriority changed, waking the new head."""
+        with self._lock:
+            heapq.heapify(self._waiters)
+            self._wake_head()
+
+    def acquire(self, priority: PriorityLike, tokens: float = 0) -> Permit:
+        waiter = _Waiter(priority, next(self._seq), None)
+        with self._lock:
+            heapq.heappush(self._waiters, waiter)
+        try:
+            while True:
+                with self._lock:
+                    delay = self._try_admit(waiter, tokens)
+                if delay is None:
+                    return Permit(waiter.priority, tokens)
+                waiter.event.wait(delay or None)
+                waiter.event.clear()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    async def aacquire(self, priority: PriorityLike, tokens: float = 0) -> Permit:
+        waiter = _Waiter(priority, next(self._seq), asyncio.get_running_loop())
+        with self._lock:
+            heapq.heappush(self._waiters, waiter)
+        try:
+            while True:
+                with self._lock:
+                    delay = self._try_admit(waiter, tokens)
+                if delay is None:
+                    return Permit(waiter.priority, tokens)
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), delay or None)
+                except asyncio.TimeoutError:
+                    pass
+                waiter.event.clear()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def release(self, permit: Permit) -> None:
+        latency = time.monotonic() - permit.started
+        with self._lock:
+            self.inflight -= 1
+            if permit.rate_limited:
+                self.rate_limited += 1
+                self.limit = max(self.min_concurrency, self.limit / 2)
+            elif latency > self.target_latency:
+                self.limit = max(self.min_concurrency, self.limit * 0.9)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            if self.tokens is not None and permit.tokens_used is not None:
+                self.tokens.adjust(permit.tokens_used - permit.tokens)
+            self._wake_head()
+
+    @contextmanager
+    def slot(self, tokens: float = 0, priority: Optional[Priority] = None) -> Iterator[Permit]:
+        permit = self.acquire(_current_priority.get() if priority is None else priority, tokens)
+        try:
+            yield permit
+        except BaseException as e:
+            permit.rate_limited = permit.rate_limited or is_rate_limit_error(e)
+            raise
+        finally:
+            self.release(permit)
+
+    @asynccontextmanager
+    async def aslot(self, tokens: float = 0, priority: Optional[Priority] = None):
+        permit = await self.aacquire(_current_priority.get() if priority is None else priority, tokens)
+        try:
+            yield permit
+        except BaseException as e:
+            permit.rate_limited = permit.rate_limited or is_rate_limit_error(e)
+            raise
+        finally:
+            self.release(permit)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "concurrency_limit": round(self.limit, 2),
+                "inflight": self.inflight,
+                "waiting": len(self._waiters),
+                "admitted": dict(self.admitted),
+                "rate_limited": self.rate_limited,
+            }
+
+
+def _optional_float(name: str, default: str) -> Optional[float]:
+    value = os.getenv(name, default)
+    return float(value) if value else None
+
+# Backend processes sharing the provider quotas (uvicorn --workers, which also reads
+# WEB_CONCURRENCY). The limiters are per process, so each one gets an equal share.
+WORKER_PROCESSES = max(1, int(os.getenv("BACKEND_WORKERS") or os.getenv("WEB_CONCURRENCY") or "1"))
+
+def _share(total: Optional[float]) -> Optional[float]:
+    return total / WORKER_PROCESSES if total else total
+
+def _share_concurrency(total: int) -> int:
+    return max(1, total // WORKER_PROCESSES)
+
+# Shared limiters that every upstream call goes through
+gemini_limiter = ProviderLimiter(
+    "gemini",
+    requests_per_minute=_share(float(os.getenv("GEMINI_RPM", "1000"))),
+    tokens_per_minute=_share(_optional_float("GEMINI_TPM", "1000000")),
+    max_concurrency=_share_concurrency(int(os.getenv("GEMINI_MAX_CONCURRENCY", "32"))),
+    target_latency=float(os.getenv("GEMINI_TARGET_LATENCY", "30")),
+)
+serper_limiter = ProviderLimiter(
+    "serper",
+    requests_per_minute=_share(float(os.getenv("SERPER_RPM", "3000"))),
+    max_concurrency=_share_concurrency(int(os.getenv("SERPER_MAX_CONCURRENCY", "8"))),
+    target_latency=float(os.getenv("SERPER_TARGET_LATENCY", "3")),
+)
+
+def scheduler_stats() -> Dict[str, Dict[str, object]]:
+    return {limiter.name: limiter.stats() for limiter in (gemini_limiter, serper_limiter)}
@@ -0,0 +1,66 @@
+from typing import Any, Dict, List, Optional, Type
+from pydantic import BaseModel
+
+
+class Resource(BaseModel):
+    type: str
+    title: str
+    url: str
+    snippet: Optional[str] = None
+
+class DayPlan(BaseModel):
+    day: str
+    topic: str
+    mini_challenge: str
+    reasoning: str
+    resources: List[Resource]
+
+class DetailedDayPlan(BaseModel):
+    day: str
+    topic: str
+    detailed_description: str
+    learning_objectives: List[str]
+    mini_challenge: str
+    detailed_challenge: str
+    step_by_step_guide: List[str]
+    key_concepts: List[str]
+    reasoning: str
+    estimated_time: str
+    difficulty_level: str
+    prerequisites: List[str]
+    resources: List[Resource]
+    next_steps: str
+
+# JSON-schema keywords understood by Gemini's response_schema (an OpenAPI subset)
+_GEMINI_SCHEMA_KEYS = {"type", "format", "description", "nullable", "enum", "properties", "required", "items"}
+
+def gemini_schema(model: Type[BaseModel], as_array: bool = False) -> Dict[str, Any]:
+    """
+    Convert a Pydantic model into a Gemini response_schema dict.
+    Inlines $defs references, turns Optional[X] into a nullable X and drops
+    keywords Gemini rejects (title, default, ...).
+    """
+    schema = model.model_json_schema()
+    defs = schema.pop("$defs", {})
+
+    def convert(node: Dict[str, Any]) -> Dict[str, Any]:
+        if "$ref" in node:
+            return convert(defs[node["$ref"].split("/")[-1]])
+        if "anyOf" in node:
+            variants = [variant for variant in node["anyOf"] if variant.get("type") != "null"]
+            converted = convert(variants[0])
+            if len(variants) < len(node["anyOf"]):
+                converted["nullable"] = True
+            return converted
+
+        converted = {key: value for key, value in node.items() if key in _GEMINI_SCHEMA_KEYS}
+        if "properties" in node:
+            converted["properties"] = {name: convert(value) for name, value in node["properties"].items()}
+        if "items" in node:
+            converted["items"] = convert(node["items"])
+        return converted
+
+    converted = convert(schema)
+    if as_array:
+        return {"type": "array", "items": converted}
+    return converted
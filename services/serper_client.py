@@ -1,46 +1,442 @@
 import os
-import requests
-from dotenv import load_dotenv
+import asyncio
+import random
+import threading
+import time
+import weakref
+import httpx
+from collections import deque
+from services.blocking import run_blocking
+from services.cache import TieredCache
+from services.circuit_breaker import CircuitOpenError, serper_breaker
+from services.config import load_settings
+from services.deadline import DeadlineExceeded, bounded, check_deadline, remaining, within_deadline
+from services.metrics import count_fallback, stage
+from services.resource_index import ARTICLE, BLOG, DOCUMENTATION, RESOURCE, YOUTUBE, ResourceIndex, classify_url
+from services.scheduler import RateLimitedError, serper_limiter
+from services.singleflight import SingleFlight
 
-load_dotenv()
+load_settings()
 
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
+SERPER_URL = os.getenv("SERPER_URL", "https://google.serper.dev/search")
 
-def search_resources(query, num_results=5):
+# Upper bound on Serper requests in flight at once, shared by every caller
+SERPER_MAX_CONCURRENCY = int(os.getenv("SERPER_MAX_CONCURRENCY", "8"))
+
+# HTTP client tuning
+SERPER_POOL_SIZE = int(os.getenv("SERPER_POOL_SIZE", str(SERPER_MAX_CONCURRENCY)))
+SERPER_CONNECT_TIMEOUT = float(os.getenv("SERPER_CONNECT_TIMEOUT", "3.05"))
+SERPER_READ_TIMEOUT = float(os.getenv("SERPER_READ_TIMEOUT", "10"))
+SERPER_MAX_RETRIES = int(os.getenv("SERPER_MAX_RETRIES", "2"))
+SERPER_BACKOFF_BASE = float(os.getenv("SERPER_BACKOFF_BASE", "0.25"))
+SERPER_BACKOFF_MAX = float(os.getenv("SERPER_BACKOFF_MAX", "4"))
+
+# Async searches still waiting after this percentile of recent Serper latencies are
+# sent a second time and the first answer wins (0 disables hedging)
+SERPER_HEDGE_PERCENTILE = float(os.getenv("SERPER_HEDGE_PERCENTILE", "95"))
+SERPER_HEDGE_MIN_SAMPLES = int(os.getenv("SERPER_HEDGE_MIN_SAMPLES", "20"))
+# Only requests carrying at most this many queries are hedged and sampled: a duplicate
+# of a large batch would repeat every query in it, and its latency is not comparable
+SERPER_HEDGE_MAX_QUERIES = int(os.getenv("SERPER_HEDGE_MAX_QUERIES", "3"))
+
+# Queries sent per batched Serper request (Serper accepts an array of queries in one
+# POST). 0 sends every query as its own request.
+SERPER_BATCH_SIZE = int(os.getenv("SERPER_BATCH_SIZE", "100"))
+
+# Status codes worth retrying: rate limiting and transient upstream failures
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Search results cache: in-memory LRU in front of SQLite. An empty path keeps it memory-only.
+search_cache = TieredCache(
+    ttl=float(os.getenv("SERPER_CACHE_TTL", str(7 * 24 * 3600))),
+    memory_entries=int(os.getenv("SERPER_CACHE_MEMORY_ENTRIES", "2048")),
+    disk_path=os.getenv("SERPER_CACHE_PATH", ".cache/skillpath.sqlite3") or None,
+    disk_entries=int(os.getenv("SERPER_CACHE_DISK_ENTRIES", "200000")),
+    table="serper_results",
+)
+
+# Local BM25 index over every result Serper has returned, queried before Serper itself
+RESOURCE_INDEX = os.getenv("RESOURCE_INDEX", "1").lower() not in ("0", "false", "no")
+resource_index = ResourceIndex(
+    path=os.getenv("SERPER_CACHE_PATH", ".cache/skillpath.sqlite3") or None,
+    max_age=float(os.getenv("RESOURCE_INDEX_MAX_AGE", str(7 * 24 * 3600))),
+    max_documents=int(os.getenv("RESOURCE_INDEX_MAX_DOCUMENTS", "50000")),
+    min_coverage=float(os.getenv("RESOURCE_INDEX_MIN_COVERAGE", "0.75")),
+) if RESOURCE_INDEX else None
+
+# Concurrent cache misses for the same query share one Serper request
+_search_flight = SingleFlight("serper")
+
+def normalize_query(query):
+    """Normalize a query for cache lookups: lowercase with collapsed whitespace."""
+    return " ".join(query.lower().split())
+
+async def aget_cached_results(query, num_results):
     """
-    Search Google dynamically for a query using Serper API.
-    Returns a list of dictionaries with 'title', 'url', and 'snippet'.
+    Return cached results for a query, or None on a miss.
+    An entry fetched with a larger num_results also answers smaller requests,
+    since Serper returns the same ranking truncated to the requested size.
+    A memory miss reads the disk tier on a worker thread.
+    """
+    return cached_entry_results(await search_cache.aget(normalize_query(query)), num_results)
+
+def cached_entry_results(entry, num_results):
+    if entry is None or entry.value["num"] < num_results:
+        return None
+    # Hand out copies: callers relabel result["type"] in place. Entries cached before
+    # results carried type labels still say "Web" and are labelled here.
+    return [
+        dict(result, type=classify_url(result["url"])) if result["type"] == "Web" else dict(result)
+        for result in entry.value["results"][:num_results]
+    ]
+
+def flight_key(query, num_results):
+    return f"{normalize_query(query)}|{num_results}"
+
+async def astore_cached_results(query, num_results, resources):
+    """
+    Cache a successful response and add its results to the local index. Only reached
+    on a miss, so it never shadows a larger entry. The SQLite writes run on worker threads.
+    """
+    await search_cache.aset(normalize_query(query), {"num": num_results, "results": resources})
+    if resource_index is not None:
+        await resource_index.aadd(resources)
+
+def parse_organic_results(results):
+    """Convert a Serper response body into resource dictionaries, labelled by URL."""
+    resources = []
+    for item in results.get("organic", []):
+        resources.append({
+            "type": classify_url(item.get("link")),
+            "title": item.get("title"),
+            "url": item.get("link"),
+            "snippet": item.get("snippet")
+        })
+    return resources
+
+async def abatch_requests(queries):
     """
-    if not SERPER_API_KEY:
-        return []
+    The distinct queries among (query, num_results) pairs that are not answered by the
+    cache, each with the largest num_results asked for, as {flight key: (query, num_results)}.
+    """
+    cached = await asyncio.gather(*(aget_cached_results(query, num_results) for query, num_results in queries))
+    missing = {}
+    for (query, num_results), hit in zip(queries, cached):
+        key = normalize_query(query)
+        if key in missing:
+            missing[key] = (missing[key][0], max(missing[key][1], num_results))
+        elif hit is None:
+            missing[key] = (query, num_results)
+    return {flight_key(*request): request for request in missing.values()}
+
+def payload_queries(payload):
+    """Number of queries in a request body: a batch is a list of queries, a single search a dict."""
+    return len(payload) if isinstance(payload, list) else 1
+
+def batch_chunks(requests_by_key, size=SERPER_BATCH_SIZE):
+    items = list(requests_by_key.items())
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+def batch_payload(chunk):
+    return [{"q": query, "num": num_results} for _, (query, num_results) in chunk]
+
+async def astore_batch(chunk, response):
+    """Cache each query of a batched response; returns {flight key: resources}."""
+    fetched = {}
+    for (key, (query, num_results)), results in zip(chunk, response):
+        fetched[key] = parse_organic_results(results)
+        await astore_cached_results(query, num_results, fetched[key])
+    return fetched
+
+def raise_batch_errors(errors):
+    """Re-raise the failures a batch's callers must see: a spent deadline or an open circuit. Other failures mean no results."""
+    for error in errors.values():
+        if isinstance(error, (DeadlineExceeded, CircuitOpenError)):
+            raise error
+
+async def abatch_results(queries, missing, results):
+    """
+    Results for each (query, num_results) pair: from the batch (or the batch another caller
+    was already sending) when fetched, otherwise from the cache.
+    """
+    fetched = {normalize_query(missing[key][0]): resources for key, resources in results.items()}
     
-    url = "https://google.serper.dev/search"
-    payload = {
-        "q": query,
-        "num": num_results
-    }
-    headers = {
-        "X-API-KEY": SERPER_API_KEY,
-        "Content-Type": "application/json"
-    }
+    async def answer(query, num_results):
+        resources = fetched.get(normalize_query(query))
+        if resources is not None:
+            return [dict(resource) for resource in resources[:num_results]]
+        return await aget_cached_results(query, num_results) or []
     
-    try:
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        results = response.json()
+    return list(await asyncio.gather(*(answer(query, num_results) for query, num_results in queries)))
+
+def backoff_delay(attempt, base=SERPER_BACKOFF_BASE, cap=SERPER_BACKOFF_MAX):
+    """Full-jitter exponential backoff: a random delay in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def fits_budget(delay):
+    """Whether sleeping for delay still leaves time in the request's budget."""
+    left = remaining()
+    return left is None or delay < left
+
+class SerperClient:
+    """
+    Reusable Serper client.
+    Holds one keep-alive httpx AsyncClient with a bounded connection pool per event
+    loop, applies separate connect/read timeouts, and retries only transient failures
+    (connection errors, timeouts, 429 and 5xx) with jittered exponential backoff.
+    Search is read-only, so resending a query is safe.
+
+    asearch() is the implementation; search() runs it for blocking callers on the
+    shared background loop (see services.blocking).
+
+    Timeouts and retries are cut short by the request's deadline budget. While
+    Serper's circuit breaker is open, searches that miss the cache raise
+    CircuitOpenError instead of waiting for their own failures. Attempts that outlive SERPER_HEDGE_PERCENTILE of recent latencies are hedged
+    with a duplicate request, and whichever answers first is used; batches of
+    more than SERPER_HEDGE_MAX_QUERIES queries are never hedged.
+    """
+
+    def __init__(
+        self,
+        api_key=None,
+        url=SERPER_URL,
+        pool_size=SERPER_POOL_SIZE,
+        connect_timeout=SERPER_CONNECT_TIMEOUT,
+        read_timeout=SERPER_READ_TIMEOUT,
+        max_retries=SERPER_MAX_RETRIES,
+    ):
+        self.api_key = api_key if api_key is not None else SERPER_API_KEY
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        # httpx clients are bound to the loop they were first used on
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._latencies = deque(maxlen=200)
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.headers = {
+            "X-API-KEY": self.api_key or "",
+            "Content-Type": "application/json"
+        }
+
+    def search(self, query, num_results=5):
+        """
+        Search Google dynamically for a query using Serper API.
+        Returns a list of dictionaries with 'title', 'url', and 'snippet'.
+        """
+        return run_blocking(self.asearch(query, num_results))
+
+    async def asearch(self, query, num_results=5):
+        """Async variant of search(); search() runs it for blocking callers."""
+        if not self.api_key:
+            return []
+        
+        cached = await aget_cached_results(query, num_results)
+        if cached is not None:
+            return cached
+        
+        async def fetch():
+            resources = parse_organic_results(await self._apost({"q": query, "num": num_results}))
+            await astore_cached_results(query, num_results, resources)
+            return resources
+        
+        try:
+            resources = await within_deadline(_search_flight.ado(flight_key(query, num_results), fetch), "serper")
+            return [dict(resource) for resource in resources]
+        except (DeadlineExceeded, CircuitOpenError):
+            raise
+        except Exception as e:
+            print(f"Serper API error: {e}")
+            count_fallback("serper_no_results")
+            return []
+
+    async def asearch_batch(self, queries):
+        """
+        Run several searches with as few requests as possible: cached queries are answered
+        locally and the rest are de-duplicated and sent SERPER_BATCH_SIZE per request,
+        concurrently. Takes (query, num_results) tuples and returns the result lists in the same order.
+        """
+        if not self.api_key:
+            return [[] for _ in queries]
+        
+        missing = await abatch_requests(queries)
         
-        resources = []
-        for item in results.get("organic", []):
-            resources.append({
-                "type": "Web",
-                "title": item.get("title"),
-                "url": item.get("link"),
-                "snippet": item.get("snippet")
-            })
-        return resources
-    except Exception as e:
-        print(f"Serper API error: {e}")
-        return []
+        async def fetch(keys):
+            chunks = batch_chunks({key: missing[key] for key in keys})
+            responses = await asyncio.gather(*(self._apost(batch_payload(chunk)) for chunk in chunks), return_exceptions=True)
+            fetched = {}
+            for chunk, response in zip(chunks, responses):
+                if isinstance(response, (DeadlineExceeded, CircuitOpenError)):
+                    raise response
+                if isinstance(response, BaseException):
+                    print(f"Serper API error for a batch of {len(chunk)} queries: {response}")
+                    count_fallback("serper_no_results")
+                    continue
+                fetched.update(await astore_batch(chunk, response))
+            return fetched
+        
+        results, errors = await within_deadline(_search_flight.ado_many(missing, fetch), "serper")
+        raise_batch_errors(errors)
+        return await abatch_results(queries, missing, results)
+
+    def _get_async_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            connect_timeout, read_timeout = self.timeout
+            client = self._async_clients[loop] = httpx.AsyncClient(
+                headers=self.headers,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            )
+        return client
+
+    async def _apost(self, payload):
+        """
+        POST a payload, retrying transient failures. Returns the decoded JSON body.
+        Backoff sleeps happen outside the Serper limiter. Payloads of more than SERPER_HEDGE_MAX_QUERIES queries are not hedged."""
+        client = self._get_async_client()
+        hedge = payload_queries(payload) <= SERPER_HEDGE_MAX_QUERIES
+        attempt = 0
+        while True:
+            check_deadline("serper")
+            try:
+                response = await (self._ahedged_send(client, payload) if hedge else self._asend(client, payload))
+            except httpx.TransportError:
+                delay = backoff_delay(attempt)
+                if attempt >= self.max_retries or not fits_budget(delay):
+                    check_deadline("serper")
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                delay = self._retry_after(response) or backoff_delay(attempt)
+                if fits_budget(delay):
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+            self._raise_for_status(response)
+            return response.json()
+
+    async def _asend(self, client, payload):
+        """One attempt, admitted by Serper's circuit breaker and the shared Serper limiter."""
+        connect_timeout, read_timeout = self.timeout
+        with serper_breaker.guard() as call:
+            async with serper_limiter.aslot() as permit:
+                with stage("serper"):
+                    start = time.monotonic()
+                    response = await client.post(self.url, json=payload, timeout=httpx.Timeout(bounded(read_timeout), connect=bounded(connect_timeout)))
+                    if payload_queries(payload) <= SERPER_HEDGE_MAX_QUERIES:
+                        # Hedging decisions are based on the latencies of requests small enough to hedge
+                        self._latencies.append(time.monotonic() - start)
+                permit.rate_limited = response.status_code == 429
+            call.failed = response.status_code >= 500
+        return response
+
+    async def _ahedged_send(self, client, payload):
+        """
+        Send an attempt; if it is still running after the hedge delay, send a duplicate
+        and return the first successful response. The other one is cancelled.
+        """
+        first = asyncio.ensure_future(self._asend(client, payload))
+        pending = {first}
+        try:
+            delay = self.hedge_delay()
+            if delay is None:
+                return await first
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return first.result()
+
+            self.hedged += 1
+            hedge = asyncio.ensure_future(self._asend(client, payload))
+            pending = {first, hedge}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def hedge_delay(self):
+        """SERPER_HEDGE_PERCENTILE of recent attempt latencies, or None while hedging is off or samples are too few."""
+        if SERPER_HEDGE_PERCENTILE <= 0 or len(self._latencies) < SERPER_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * SERPER_HEDGE_PERCENTILE / 100))]
+
+    def stats(self):
+        delay = self.hedge_delay()
+        return {"hedged": self.hedged, "hedge_wins": self.hedge_wins, "hedge_delay": round(delay, 3) if delay is not None else None}
+
+    def _raise_for_status(self, response):
+        """Raise for error responses, reporting quota exhaustion as RateLimitedError."""
+        if response.status_code == 429:
+            raise RateLimitedError("serper", "Serper rate limit exceeded", self._retry_after(response))
+        response.raise_for_status()
+
+    @staticmethod
+    def _retry_after(response):
+        """Honor a numeric Retry-After header, capped at the maximum backoff."""
+        value = response.headers.get("Retry-After")
+        try:
+            return min(float(value), SERPER_BACKOFF_MAX) if value else None
+        except ValueError:
+            return None
+
+    def close(self):
+        """Close the connections opened by blocking callers."""
+        run_blocking(self.aclose())
+
+    async def aclose(self):
+        """Close the connections opened on the running loop."""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_default_client():
+    """Return the process-wide SerperClient, creating it on first use."""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = SerperClient()
+    return _default_client
+
+def search_resources(query, num_results=5):
+    """
+    Search Google dynamically for a query using Serper API.
+    Returns a list of dictionaries with 'title', 'url', and 'snippet'.
+    """
+    return get_default_client().search(query, num_results)
+
+async def asearch_resources(query, num_results=5):
+    """Async variant of search_resources."""
+    return await get_default_client().asearch(query, num_results)
+
+async def asearch_many(queries):
+    """
+    Run several independent searches: batched into as few requests as possible, or
+    concurrently one request each when SERPER_BATCH_SIZE is 0.
+    Takes a list of (query, num_results) tuples and returns the result lists in the same order.
+    """
+    if SERPER_BATCH_SIZE > 0:
+        return await get_default_client().asearch_batch(queries)
+    return list(await asyncio.gather(*(asearch_resources(query, num_results) for query, num_results in queries)))
 
 def search_youtube_videos(topic, num_results=3):
     """Search for YouTube videos related to the topic"""
@@ -52,77 +448,181 @@ def search_articles_blogs(topic, num_results=3):
     query = f"{topic} guide article blog tutorial"
     return search_resources(query, num_results)
 
-def get_comprehensive_resources(topic, day_topic):
-    """Get a comprehensive set of resources for a learning topic"""
+def comprehensive_queries(topic, day_topic):
+    """Queries behind get_comprehensive_resources, as (query, num_results) tuples."""
+    return [
+        (f"{topic} {day_topic} tutorial video", 2),
+        (f"{topic} {day_topic} guide tutorial", 3),
+        (f"{topic} {day_topic} documentation official", 2),
+    ]
+
+def select_comprehensive_resources(youtube_results, article_results, docs_results):
+    """Classify the comprehensive query results into typed resources."""
     all_resources = []
     
     # YouTube videos
-    youtube_query = f"{topic} {day_topic} tutorial video"
-    youtube_results = search_resources(youtube_query, 2)
     for result in youtube_results:
-        if "youtube.com" in result["url"]:
-            result["type"] = "YouTube"
+        if result["type"] == YOUTUBE:
             all_resources.append(result)
     
     # Articles and blogs
-    article_query = f"{topic} {day_topic} guide tutorial"
-    article_results = search_resources(article_query, 3)
     for result in article_results:
-        if "youtube.com" not in result["url"]:
+        if result["type"] != YOUTUBE:
             result["type"] = "Article"
             all_resources.append(result)
     
     # Documentation/official resources
-    docs_query = f"{topic} {day_topic} documentation official"
-    docs_results = search_resources(docs_query, 2)
     for result in docs_results:
-        if any(domain in result["url"] for domain in ["docs.", "documentation", "official"]):
-            result["type"] = "Documentation"
-        else:
+        if result["type"] != DOCUMENTATION:
             result["type"] = "Resource"
         all_resources.append(result)
     
     return all_resources[:8]  # Limit to 8 total resources
 
-def get_limited_resources_for_overview(topic, day_topic):
-    """Get limited resources for the overview page: 1 YouTube, 1 Article, 1 Blog"""
+def overview_queries(topic, day_topic):
+    """Queries behind get_limited_resources_for_overview, as (query, num_results) tuples."""
+    return [
+        (f"{topic} {day_topic} tutorial video", 3),
+        (f"{topic} {day_topic} guide tutorial", 5),
+        (f"{topic} {day_topic} blog post tutorial", 5),
+    ]
+
+def overview_fallback_query(topic, day_topic):
+    """General query used only when the overview queries yield fewer than 3 resources."""
+    return (f"{topic} {day_topic}", 5)
+
+def select_overview_resources(youtube_results, article_results, blog_results):
+    """Pick 1 YouTube video, 1 Article and 1 Blog post from the overview query results."""
     limited_resources = []
     
     # Get 1 YouTube video
-    youtube_query = f"{topic} {day_topic} tutorial video"
-    youtube_results = search_resources(youtube_query, 3)
     for result in youtube_results:
-        if "youtube.com" in result["url"]:
-            result["type"] = "YouTube"
+        if result["type"] == YOUTUBE:
             limited_resources.append(result)
             break  # Only take the first YouTube result
     
     # Get 1 Article
-    article_query = f"{topic} {day_topic} guide tutorial"
-    article_results = search_resources(article_query, 5)
     for result in article_results:
-        if "youtube.com" not in result["url"] and any(domain in result["url"] for domain in ["medium.com", "dev.to", "towardsdatascience.com", "blog", "article"]):
+        if result["type"] in (ARTICLE, BLOG):
             result["type"] = "Article"
             limited_resources.append(result)
             break  # Only take the first article
     
     # Get 1 Blog post (different from article)
-    blog_query = f"{topic} {day_topic} blog post tutorial"
-    blog_results = search_resources(blog_query, 5)
     for result in blog_results:
-        if "youtube.com" not in result["url"] and result["url"] not in [r["url"] for r in limited_resources]:
+        if result["type"] != YOUTUBE and result["url"] not in [r["url"] for r in limited_resources]:
             result["type"] = "Blog"
             limited_resources.append(result)
             break  # Only take the first unique blog
     
+    return limited_resources
+
+def fill_overview_resources(limited_resources, general_results):
+    """Top up the overview resources to 3 with general web results."""
+    for result in general_results:
+        if result["url"] not in [r["url"] for r in limited_resources]:
+            result["type"] = "Resource"
+            limited_resources.append(result)
+            if len(limited_resources) >= 3:
+                break
+    return limited_resources
+
+def local_comprehensive_resources(topic, day_topic):
+    """2 videos, then articles and documentation (5 in all) from the local index, or None when it cannot supply them."""
+    query = f"{topic} {day_topic}"
+    videos = resource_index.search(query, limit=2, types=[YOUTUBE])
+    docs = resource_index.search(query, limit=2, types=[DOCUMENTATION])
+    articles = resource_index.search(query, limit=5 - len(docs), types=[ARTICLE, BLOG, RESOURCE])
+    if len(videos) < 2 or len(docs) + len(articles) < 5:
+        return None
+    for result in articles:
+        result["type"] = "Article"
+    return videos + articles + docs
+
+def local_overview_resources(topic, day_topic):
+    """1 YouTube video, 1 Article and 1 Blog post from the local index, or None when it cannot supply all three."""
+    query = f"{topic} {day_topic}"
+    limited_resources = []
+    for label, types in (("YouTube", [YOUTUBE]), ("Article", [ARTICLE, BLOG]), ("Blog", [BLOG, ARTICLE, DOCUMENTATION, RESOURCE])):
+        hits = resource_index.search(query, limit=1, types=types, exclude_urls=[r["url"] for r in limited_resources])
+        if not hits:
+            return None
+        hits[0]["type"] = label
+        limited_resources.append(hits[0])
+    return limited_resources
+
+def lookup_local(select, topic, day_topic):
+    """Answer from the local index when it has enough fresh, relevant results; None means ask Serper."""
+    if resource_index is None:
+        return None
+    with stage("resource_index"):
+        resources = select(topic, day_topic)
+    resource_index.record_lookup(resources is not None)
+    return resources
+
+async def acached_comprehensive_resources(topic, day_topic):
+    """Comprehensive resources from already cached search results only, for when the request's budget has run out."""
+    return select_comprehensive_resources(*[await aget_cached_results(query, num_results) or [] for query, num_results in comprehensive_queries(topic, day_topic)])
+
+async def acached_overview_resources(topic, day_topic):
+    """Overview resources from already cached search results only, for when the request's budget has run out."""
+    return select_overview_resources(*[await aget_cached_results(query, num_results) or [] for query, num_results in overview_queries(topic, day_topic)])
+
+def get_comprehensive_resources(topic, day_topic):
+    """Get a comprehensive set of resources for a learning topic"""
+    return run_blocking(aget_comprehensive_resources(topic, day_topic))
+
+def get_limited_resources_for_overview(topic, day_topic):
+    """Get limited resources for the overview page: 1 YouTube, 1 Article, 1 Blog"""
+    return run_blocking(aget_limited_resources_for_overview(topic, day_topic))
+
+def plan_overview_queries(topic, day_topics, resources):
+    """The days the local index could not answer (resources[i] is None) and their overview queries, flattened."""
+    pending = [index for index, found in enumerate(resources) if found is None]
+    return pending, [query for index in pending for query in overview_queries(topic, day_topics[index])]
+
+def select_plan_overview_resources(topic, day_topics, resources, pending, results):
+    """Hand each pending day its share of the batched results; returns the days still short of 3 resources and their fallback queries."""
+    results = iter(results)
+    for index in pending:
+        resources[index] = select_overview_resources(*(next(results) for _ in overview_queries(topic, day_topics[index])))
+    short = [index for index in pending if len(resources[index]) < 3]
+    for _ in short:
+        count_fallback("overview_fallback_query")
+    return short, [overview_fallback_query(topic, day_topics[index]) for index in short]
+
+async def aget_plan_overview_resources(topic, day_topics):
+    """
+    Overview resources for every day of a plan, planned as one batch: the local index
+    answers what it can, every remaining day's queries go to Serper together (duplicates
+    removed), and only days still short of 3 resources need a second batch for the
+    fallback query. Returns one resource list per day topic.
+    """
+    resources = [lookup_local(local_overview_resources, topic, day_topic) for day_topic in day_topics]
+    pending, queries = plan_overview_queries(topic, day_topics, resources)
+    short, fallback_queries = select_plan_overview_resources(topic, day_topics, resources, pending, await asearch_many(queries))
+    for index, general_results in zip(short, await asearch_many(fallback_queries)):
+        resources[index] = fill_overview_resources(resources[index], general_results)
+    return [found[:3] for found in resources]
+
+async def aget_comprehensive_resources(topic, day_topic):
+    """Async variant of get_comprehensive_resources."""
+    local = lookup_local(local_comprehensive_resources, topic, day_topic)
+    if local is not None:
+        return local
+    return select_comprehensive_resources(*await asearch_many(comprehensive_queries(topic, day_topic)))
+
+async def aget_limited_resources_for_overview(topic, day_topic):
+    """Async variant of get_limited_resources_for_overview."""
+    local = lookup_local(local_overview_resources, topic, day_topic)
+    if local is not None:
+        return local
+    limited_resources = select_overview_resources(*await asearch_many(overview_queries(topic, day_topic)))
+    
     # If we don't have 3 resources, fill with general web results
     if len(limited_resources) < 3:
-        general_results = search_resources(f"{topic} {day_topic}", 5)
-        for result in general_results:
-            if result["url"] not in [r["url"] for r in limited_resources]:
-                result["type"] = "Resource"
-                limited_resources.append(result)
-                if len(limited_resources) >= 3:
-                    break
+        count_fallback("overview_fallback_query")
+        general_results = await asearch_resources(*overview_fallback_query(topic, day_topic))
+        limited_resources = fill_overview_resources(limited_resources, general_results)
     
     return limited_resources[:3]  # Ensure exactly 3 resources
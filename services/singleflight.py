@@ -0,0 +1,149 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from services.deadline import no_deadline
+
+# Every group created in the process, by name, for metrics reporting
+_groups: Dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers arriving
+    while it is in flight wait and receive the same result, or the same
+    exception. Once the call finishes the key is released, so later calls run
+    again (normally hitting a cache the leader filled).
+
+    The shared call runs as its own task, so a cancelled caller does not cancel it
+    for the others, and without the leader's request deadline, so the leader's
+    budget running out does not fail it for callers with more time left; every
+    caller bounds its own wait. ado_many() does the same for a function that
+    fetches several keys in one execution, such as a batched request.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._ainflight: Dict[str, "asyncio.Task"] = {}
+        _groups[name] = self
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task, _ = self.astart(key, fn)
+        return await asyncio.shield(task)
+
+    def astart(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple["asyncio.Task", bool]:
+        """
+        Like ado(), but return the shared task instead of waiting for it, together with
+        whether this caller started it. For callers that follow a call's progress as it runs.
+        """
+        task = self._running(key)
+        leader = task is None
+        if leader:
+            with no_deadline():
+                task = asyncio.ensure_future(fn())
+            self._ainflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        with self._lock:
+            self.calls += 1
+            if leader:
+                self.executions += 1
+            else:
+                self.coalesced += 1
+        return task, leader
+
+    async def ado_many(self, keys: Iterable[str], fn: Callable[[List[str]], Awaitable[Dict[str, Any]]]) -> Tuple[Dict[str, Any], Dict[str, BaseException]]:
+        """
+        Lead every key not already in flight and run fn once for them; fn returns
+        {key: result} for the keys it fetched. Keys another caller is fetching are
+        waited for. Returns (results, errors) by key: a key fails with the exception
+        fn raised, or with KeyError when fn left it out. fn runs as its own task, and
+        each key it leads is in flight as a future ado() callers can share.
+        """
+        owned: Dict[str, "asyncio.Future"] = {}
+        waiting: Dict[str, "asyncio.Future"] = {}
+        for key in dict.fromkeys(keys):
+            task = self._running(key)
+            if task is None:
+                owned[key] = self._ainflight[key] = asyncio.get_running_loop().create_future()
+                owned[key].add_done_callback(lambda done, key=key: self._finish(key, done))
+            else:
+                waiting[key] = task
+        if owned:
+            with no_deadline():
+                task = asyncio.ensure_future(fn(list(owned)))
+            task.add_done_callback(lambda done: _resolve(owned, done))
+        with self._lock:
+            self.calls += len(owned) + len(waiting)
+            self.executions += len(owned)
+            self.coalesced += len(waiting)
+
+        results: Dict[str, Any] = {}
+        errors: Dict[str, BaseException] = {}
+        for key, future in {**owned, **waiting}.items():
+            try:
+                results[key] = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                errors[key] = asyncio.CancelledError()
+            except Exception as e:
+                errors[key] = e
+        return results, errors
+
+    def inflight(self, key: str) -> Optional["asyncio.Task"]:
+        """The async call currently running for key, if any."""
+        return self._ainflight.get(key)
+
+    def _running(self, key: str) -> Optional["asyncio.Future"]:
+        """
+        The call in flight for key on the running loop. A call on another loop (the
+        blocking callers' loop, see services.blocking) cannot be awaited here, so
+        that key is fetched again and the newer call is the one shared from then on.
+        """
+        task = self._ainflight.get(key)
+        if task is not None and task.get_loop() is not asyncio.get_running_loop():
+            return None
+        return task
+
+    def _finish(self, key: str, task: "asyncio.Task") -> None:
+        if self._ainflight.get(key) is task:
+            del self._ainflight[key]
+        # Retrieve the exception so it is not reported as unhandled when every caller went away
+        if not task.cancelled() and task.exception() is not None:
+            with self._lock:
+                self.errors += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "inflight": len(self._ainflight),
+        }
+
+
+def _resolve(futures: Dict[str, "asyncio.Future"], task: "asyncio.Task") -> None:
+    """Settle the per-key futures of an ado_many() call from its finished task."""
+    for key, future in futures.items():
+        if future.done():
+            continue
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        elif key in task.result():
+            future.set_result(task.result()[key])
+        else:
+            future.set_exception(KeyError(key))
+
+
+def singleflight_stats() -> Dict[str, Dict[str, int]]:
+    """Coalescing counters for every single-flight group, keyed by group name."""
+    return {name: group.stats() for name, group in _groups.items()}
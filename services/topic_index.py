@@ -0,0 +1,212 @@
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Words that change how a topic is phrased but not what it is about
+STOP_WORDS = frozenset(
+    "a an and the for with in on of to from into by using use via about how what is are "
+    "learn i want my me".split()
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#]+")
+_MERSENNE_PRIME = (1 << 61) - 1
+
+def stem(word: str) -> str:
+    """
+    Light suffix stripping so plural and -ing/-ed forms of a word compare equal,
+    including -es plurals such as classes, indexes and analyses (-> analysis).
+    """
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            # programming -> programm -> program
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]
+            return word
+    if word.endswith(("sses", "xes")):
+        return word[:-2]
+    if word.endswith(("yses", "eses")):
+        return word[:-2] + "is"
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+def content_words(text: str) -> List[str]:
+    """Lowercased, stemmed words of a text in order, with repeats and without stop words."""
+    return [stem(token) for token in _TOKEN_RE.findall((text or "").lower()) if token not in STOP_WORDS]
+
+def canonical_tokens(topic: str) -> List[str]:
+    """Lowercased, stemmed content words of a topic, sorted so word order does not matter."""
+    return sorted(set(content_words(topic)))
+
+def shingles(tokens: Iterable[str], size: int = 3) -> FrozenSet[str]:
+    """
+    Character n-grams of each token (with word boundaries). These tolerate different
+    endings of a word, but not typos: a swapped or wrong letter changes every n-gram
+    around it, so "pyhton" and "python" share only a fifth of theirs and do not match.
+    """
+    grams = set()
+    for token in tokens:
+        padded = f" {token} "
+        if len(padded) <= size:
+            grams.add(padded)
+        grams.update(padded[start:start + size] for start in range(len(padded) - size + 1))
+    return frozenset(grams)
+
+def numbers(tokens: Iterable[str]) -> FrozenSet[str]:
+    """Numeric tokens such as versions ("python 2" vs "python 3"), which must agree for a match."""
+    return frozenset(token for token in tokens if token.isdigit())
+
+def jaccard(left: FrozenSet[str], right: FrozenSet[str]) -> float:
+    if not left and not right:
+        return 1.0
+    return len(left & right) / len(left | right)
+
+def token_similarity(left: str, right: str) -> float:
+    """How alike two content words are. Short words (3 characters or fewer) and numbers only match exactly."""
+    if left == right:
+        return 1.0
+    if len(left) <= 3 or len(right) <= 3 or left.isdigit() or right.isdigit():
+        return 0.0
+    return jaccard(shingles([left]), shingles([right]))
+
+def word_agreement(left: Iterable[str], right: Iterable[str]) -> float:
+    """
+    Similarity of two topics word by word: each content word on either side is paired
+    with its closest word on the other side, and the weakest pair is the score. A word
+    with no counterpart ("data science" vs "data science in R") scores 0.
+    """
+    left, right = list(left), list(right)
+    if not left or not right:
+        return 0.0
+    return min(
+        min(max(token_similarity(token, other) for other in right) for token in left),
+        min(max(token_similarity(token, other) for other in left) for token in right),
+    )
+
+
+class TopicIndex:
+    """
+    Near-duplicate index over previously generated topics.
+
+    Topics are reduced to stemmed content words, turned into character 3-gram
+    shingles and summarized with MinHash; LSH banding finds candidates in
+    constant time. A candidate matches only if every content word on each side
+    has a counterpart on the other whose shingle similarity reaches the
+    threshold, so an extra qualifier ("in R", "ops") never matches. Short words
+    and numbers (versions, levels) must agree exactly. Topics with identical
+    content words (e.g. "Python for data analysis" and "data analysis with
+    Python") match directly without hashing, and topics made only of stop words
+    never match.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16, max_topics: int = 100_000):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.max_topics = max_topics
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Fixed coefficients keep signatures stable across processes
+        self._coefficients = [((index * 0x9E3779B1 + 1) % _MERSENNE_PRIME, (index * 0x85EBCA77 + 7) % _MERSENNE_PRIME) for index in range(num_perm)]
+        # Content words -> topics phrased with exactly those words, oldest first
+        self._exact: Dict[Tuple[str, ...], List[str]] = {}
+        self._shingles: Dict[str, FrozenSet[str]] = {}
+        self._tokens: Dict[str, Tuple[str, ...]] = {}
+        self._buckets: List[Dict[Tuple[int, ...], List[str]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+        self.matches = 0
+        self.misses = 0
+
+    def _signature(self, grams: FrozenSet[str]) -> List[int]:
+        hashes = [zlib.crc32(gram.encode()) for gram in grams] or [0]
+        return [min((a * value + b) % _MERSENNE_PRIME for value in hashes) for a, b in self._coefficients]
+
+    def _band_keys(self, grams: FrozenSet[str]) -> List[Tuple[int, ...]]:
+        signature = self._signature(grams)
+        return [tuple(signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def add(self, topic: str) -> None:
+        """Index a topic so later near-duplicates resolve to it. The oldest topics are dropped past max_topics."""
+        tokens = tuple(canonical_tokens(topic))
+        grams = shingles(tokens)
+        with self._lock:
+            if topic in self._shingles:
+                return
+            self._exact.setdefault(tokens, []).append(topic)
+            self._shingles[topic] = grams
+            self._tokens[topic] = tokens
+            for buckets, band_key in zip(self._buckets, self._band_keys(grams)):
+                buckets.setdefault(band_key, []).append(topic)
+            while len(self._tokens) > self.max_topics:
+                self._discard(next(iter(self._tokens)))
+
+    def discard(self, topic: str) -> None:
+        with self._lock:
+            self._discard(topic)
+
+    def _discard(self, topic: str) -> None:
+        grams = self._shingles.pop(topic, None)
+        if grams is None:
+            return
+        tokens = self._tokens.pop(topic)
+        self._remove_from(self._exact, tokens, topic)
+        for buckets, band_key in zip(self._buckets, self._band_keys(grams)):
+            self._remove_from(buckets, band_key, topic)
+
+    @staticmethod
+    def _remove_from(groups: Dict, key: Any, topic: str) -> None:
+        group = groups.get(key)
+        if group and topic in group:
+            group.remove(topic)
+            if not group:
+                del groups[key]
+
+    def best_match(self, topic: str) -> Tuple[Optional[str], float]:
+        """The most similar indexed topic and its similarity score (None, 0.0 when nothing is close)."""
+        tokens = tuple(canonical_tokens(topic))
+        if not tokens:
+            return None, 0.0
+        with self._lock:
+            exact = self._exact.get(tokens)
+            if exact:
+                return exact[0], 1.0
+            grams = shingles(tokens)
+            candidates = set()
+            for buckets, band_key in zip(self._buckets, self._band_keys(grams)):
+                candidates.update(buckets.get(band_key, ()))
+            wanted_numbers = numbers(tokens)
+            scored = [
+                (word_agreement(tokens, self._tokens[candidate]), candidate)
+                for candidate in candidates if numbers(self._tokens[candidate]) == wanted_numbers
+            ]
+        if not scored:
+            return None, 0.0
+        score, best = max(scored)
+        return best, score
+
+    def match(self, topic: str) -> Optional[str]:
+        """Return an indexed topic similar enough to stand in for `topic`, logging the decision."""
+        start = time.perf_counter()
+        best, score = self.best_match(topic)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if best is not None and score >= self.threshold:
+            self.matches += 1
+            print(f"Topic match: '{topic}' -> '{best}' (score {score:.2f}, {elapsed_ms:.2f} ms)")
+            return best
+        self.misses += 1
+        closest = f"closest '{best}' score {score:.2f}" if best is not None else "no candidates"
+        print(f"Topic miss: '{topic}' ({closest}, threshold {self.threshold:.2f}, {elapsed_ms:.2f} ms)")
+        return None
+
+    def stats(self) -> Dict[str, float]:
+        return {"topics": len(self._shingles), "matches": self.matches, "misses": self.misses, "threshold": self.threshold}
+
+    def __len__(self) -> int:
+        return len(self._shingles)
@@ -1,10 +1,131 @@
+import os
+import atexit
+import signal
 import subprocess
 import sys
 import time
+import requests
 import streamlit as st
 
-# Start the FastAPI backend
-backend_process = subprocess.Popen([sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "0.0.0.0", "--port", "8000"])
-time.sleep(3) 
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the PID file alone
+    fcntl = None
 
-exec(open('app.py').read())
\ No newline at end of file
+BACKEND_HOST = os.getenv("BACKEND_HOST", "0.0.0.0")
+BACKEND_PORT = int(os.getenv("BACKEND_PORT", "8000"))
+BACKEND_WORKERS = int(os.getenv("BACKEND_WORKERS", "1"))
+BACKEND_STARTUP_TIMEOUT = float(os.getenv("BACKEND_STARTUP_TIMEOUT", "30"))
+BACKEND_PID_FILE = os.getenv("BACKEND_PID_FILE", ".cache/backend.pid")
+
+HEALTH_URL = f"http://127.0.0.1:{BACKEND_PORT}/health"
+
+def backend_healthy():
+    """Whether a backend is listening. Any HTTP answer counts: a degraded backend is still running."""
+    try:
+        requests.get(HEALTH_URL, timeout=0.5)
+        return True
+    except requests.RequestException:
+        return False
+
+def wait_until_healthy(process=None, timeout=BACKEND_STARTUP_TIMEOUT):
+    """Poll /health with exponential backoff until it answers, the process dies, or the timeout passes."""
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while time.monotonic() < deadline:
+        if backend_healthy():
+            return True
+        if process is not None and process.poll() is not None:
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
+    return False
+
+def read_pid():
+    try:
+        with open(BACKEND_PID_FILE) as pid_file:
+            pid = int(pid_file.read().strip())
+        os.kill(pid, 0)
+        return pid
+    except (OSError, ValueError):
+        return None
+
+class _LaunchLock:
+    """Exclusive lock next to the PID file so only one process per host starts the backend."""
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(BACKEND_PID_FILE) or ".", exist_ok=True)
+        self._file = open(BACKEND_PID_FILE + ".lock", "w")
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+def _signal_backend(process, force=False):
+    """Signal the backend's whole process group where supported, otherwise just the process."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+        elif force:
+            process.kill()
+        else:
+            process.terminate()
+    except ProcessLookupError:
+        pass
+
+def stop_backend(process):
+    """Terminate the backend and its uvicorn workers, then remove the PID file."""
+    if process.poll() is None:
+        _signal_backend(process)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            _signal_backend(process, force=True)
+            process.wait()
+    if read_pid() in (None, process.pid):
+        try:
+            os.remove(BACKEND_PID_FILE)
+        except OSError:
+            pass
+
+@st.cache_resource
+def ensure_backend():
+    """
+    Start the FastAPI backend once per host and wait until /health answers.
+    Cached for the life of the Streamlit server, so reruns skip it entirely. A
+    backend that is already running (started by another Streamlit process, or by
+    hand) is reused; the process that starts it also stops it on exit.
+    """
+    if backend_healthy():
+        return None
+
+    with _LaunchLock():
+        pid = read_pid()
+        if pid is not None:
+            # Another process started it; wait for it rather than starting a second one
+            if wait_until_healthy():
+                return pid
+            print(f"Backend process {pid} from {BACKEND_PID_FILE} is not answering; starting a new one")
+
+        command = [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", BACKEND_HOST, "--port", str(BACKEND_PORT)]
+        if BACKEND_WORKERS > 1:
+            command += ["--workers", str(BACKEND_WORKERS)]
+        # Own process group, so stopping it also stops every worker. The workers read
+        # BACKEND_WORKERS to split the upstream quotas between them.
+        process = subprocess.Popen(command, start_new_session=True, env={**os.environ, "BACKEND_WORKERS": str(BACKEND_WORKERS)})
+        with open(BACKEND_PID_FILE, "w") as pid_file:
+            pid_file.write(str(process.pid))
+        atexit.register(stop_backend, process)
+
+        if not wait_until_healthy(process):
+            stop_backend(process)
+            raise RuntimeError(f"Backend did not become healthy within {BACKEND_STARTUP_TIMEOUT}s")
+        return process.pid
+
+ensure_backend()
+
+exec(open('app.py').read())
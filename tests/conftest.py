@@ -0,0 +1,5 @@
+import os
+
+# Keep the module-level caches and stores in memory, so tests never touch .cache/
+for name in ("LLM_CACHE_PATH", "SERPER_CACHE_PATH", "PLAN_STORE_PATH", "JOB_STORE_PATH"):
+    os.environ[name] = ""
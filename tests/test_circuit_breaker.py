@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+def open_breaker(**options):
+    breaker = CircuitBreaker("test", min_calls=2, open_seconds=0.05, **options)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            with breaker.guard():
+                raise ConnectionError("down")
+    assert breaker.state == OPEN
+    return breaker
+
+def test_failures_open_the_circuit():
+    breaker = open_breaker()
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert 0 < error.value.retry_after <= 0.05
+    assert breaker.stats()["rejected"] == 1
+
+def test_failures_below_min_calls_keep_it_closed():
+    breaker = CircuitBreaker("test", min_calls=3)
+    for failed in (True, True):
+        breaker.before_call()
+        breaker.after_call(failed)
+    assert breaker.state == CLOSED
+
+def test_a_successful_trial_closes_the_circuit():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.after_call(False)
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+def test_a_failed_trial_opens_the_circuit_again():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    with pytest.raises(ConnectionError):
+        with breaker.guard():
+            raise ConnectionError("still down")
+    assert breaker.state == OPEN
+    assert breaker.opened == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+def test_a_neutral_trial_frees_the_slot_without_deciding():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    with breaker.guard() as call:
+        call.neutral = True
+    assert breaker.state == HALF_OPEN
+    with breaker.guard():
+        pass
+    assert breaker.state == CLOSED
+
+def test_half_open_admits_only_the_configured_trials():
+    breaker = open_breaker(half_open_calls=2)
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
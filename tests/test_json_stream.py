@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from services.json_stream import JSONArrayStreamParser, extract_json, recover_array_items, recover_object_members
+from services.llm_client import parse_plan_output
+
+def day(number):
+    return {"day": f"Day {number}", "topic": f"topic {number}", "mini_challenge": "build it", "reasoning": "because"}
+
+def plan_text(days):
+    return json.dumps([day(number) for number in days])
+
+def test_feed_returns_objects_as_they_complete():
+    parser = JSONArrayStreamParser()
+    text = plan_text([1, 2])
+    middle = text.index("}") + 1
+    assert parser.feed(text[:middle - 1]) == []
+    assert parser.feed(text[middle - 1:middle]) == [day(1)]
+    assert parser.feed(text[middle:]) == [day(2)]
+    assert parser.finished
+
+def test_feed_ignores_brackets_inside_strings():
+    parser = JSONArrayStreamParser()
+    items = [{"topic": "lists [1, 2] and {sets}", "quote": 'a " ] b'}]
+    assert parser.feed(json.dumps(items)) == items
+
+def test_invalid_elements_raise_unless_skipped():
+    text = '[{"a": 1}, {"b": nope}, {"c": 3}]'
+    with pytest.raises(json.JSONDecodeError):
+        JSONArrayStreamParser().feed(text)
+    assert JSONArrayStreamParser(skip_invalid=True).feed(text) == [{"a": 1}, {"c": 3}]
+
+def test_recover_array_items_from_truncated_output():
+    text = "```json\n" + plan_text([1, 2, 3])
+    truncated = text[:text.rindex("{") + 10]
+    assert recover_array_items(truncated) == [day(1), day(2)]
+
+@pytest.mark.parametrize("text", [
+    "[" + plan_text([1, 2]) + "]",
+    "[[" + plan_text([1, 2]) + "]]",
+    "[" + plan_text([1, 2])[:-1] + ", {\"day\": \"Da",
+])
+def test_recover_array_items_from_nested_arrays(text):
+    assert recover_array_items(text) == [day(1), day(2)]
+
+def test_nested_arrays_after_an_element_are_elements():
+    assert recover_array_items('[{"a": 1}, [2, 3]]') == [{"a": 1}, [2, 3]]
+
+def test_extract_json_stops_at_the_matching_bracket():
+    assert extract_json('Here: {"a": [1, {"b": "}"}]} and more }', "{") == '{"a": [1, {"b": "}"}]}'
+    assert extract_json('[{"a": 1}', "[") is None
+
+def test_recover_object_members_keeps_complete_members():
+    assert recover_object_members('{"day": "Day 1", "topic": "x", "steps": ["one", "tw') == {"day": "Day 1", "topic": "x"}
+    assert recover_object_members('{"day": "Da') == {}
+
+@pytest.mark.parametrize("text", [
+    plan_text([1, 2]),
+    "[" + plan_text([1, 2]) + "]",
+    "[[" + plan_text([1, 2]) + "]]",
+    plan_text([1, 2, 3])[:plan_text([1, 2, 3]).rindex("{") + 5],
+])
+def test_parse_plan_output(text):
+    assert parse_plan_output(text) == [dict(day(1), resources=[]), dict(day(2), resources=[])]
+
+def test_parse_plan_output_drops_invalid_days():
+    days = [day(1), {"day": "Day 2", "topic": "no challenge"}, {"topic": "no number", "mini_challenge": "x", "reasoning": "y"}]
+    assert [item["day"] for item in parse_plan_output(json.dumps(days))] == ["Day 1"]
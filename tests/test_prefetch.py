@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from backend.prefetch import PrefetchStore, prefetch_key
+
+KEY = prefetch_key("Rust", "Ownership", 1)
+
+async def failing_build():
+    await asyncio.sleep(0)
+    raise RuntimeError("upstream down")
+
+async def working_build():
+    return {"day": "Day 1"}
+
+def test_a_failed_prefetch_is_not_handed_out():
+    async def scenario():
+        store = PrefetchStore()
+        store.schedule(KEY, failing_build)
+        await asyncio.sleep(0.01)
+        missed = store.get(KEY)
+        store.schedule(KEY, working_build)
+        await asyncio.sleep(0)
+        return missed, await store.get(KEY), store.stats()
+
+    missed, day, stats = asyncio.run(scenario())
+    assert missed is None
+    assert day == {"day": "Day 1"}
+    assert stats["failed"] == 1 and stats["scheduled"] == 2
+
+def test_a_claimed_prefetch_that_fails_reaches_its_caller_once():
+    async def scenario():
+        store = PrefetchStore()
+        store.schedule(KEY, failing_build)
+        await asyncio.sleep(0)
+        claimed = store.get(KEY)
+        with pytest.raises(RuntimeError, match="upstream down"):
+            await claimed
+        return store.get(KEY)
+
+    assert asyncio.run(scenario()) is None
+
+def test_lookups_ignore_case_and_spacing():
+    assert prefetch_key("  Rust ", "ownership", 1) == KEY
@@ -0,0 +1,70 @@
+import asyncio
+
+from services.scheduler import Priority, ProviderLimiter, SharedPriority, request_priority
+
+def limiter(max_concurrency=1):
+    return ProviderLimiter("test", requests_per_minute=100_000, max_concurrency=max_concurrency)
+
+async def admit_in_order(limiter, priorities):
+    """Queue one waiter per priority behind a held slot, release it, and return the waiters' names in admission order."""
+    held = await limiter.aacquire(Priority.INTERACTIVE)
+    admitted = []
+
+    async def wait(name, priority):
+        permit = await limiter.aacquire(priority)
+        admitted.append(name)
+        limiter.release(permit)
+
+    waiters = []
+    for name, priority in priorities:
+        waiters.append(asyncio.ensure_future(wait(name, priority)))
+        await asyncio.sleep(0)
+    return held, waiters, admitted
+
+def test_higher_priority_waiters_are_admitted_first():
+    async def scenario():
+        test_limiter = limiter()
+        held, waiters, admitted = await admit_in_order(test_limiter, [
+            ("background", Priority.BACKGROUND), ("bulk", Priority.BULK), ("interactive", Priority.INTERACTIVE),
+        ])
+        test_limiter.release(held)
+        await asyncio.gather(*waiters)
+        return admitted
+
+    assert asyncio.run(scenario()) == ["interactive", "bulk", "background"]
+
+def test_raising_a_shared_priority_moves_waiting_calls_up():
+    async def scenario():
+        test_limiter = limiter()
+        prefetch = SharedPriority(Priority.BACKGROUND)
+        held, waiters, admitted = await admit_in_order(test_limiter, [("prefetch", prefetch), ("bulk", Priority.BULK)])
+        prefetch.raise_to(Priority.INTERACTIVE)
+        test_limiter.release(held)
+        await asyncio.gather(*waiters)
+        return admitted
+
+    assert asyncio.run(scenario()) == ["prefetch", "bulk"]
+
+def test_a_shared_priority_is_never_lowered():
+    shared = SharedPriority(Priority.BULK)
+    shared.raise_to(Priority.BACKGROUND)
+    assert shared.priority == Priority.BULK
+
+def test_slot_uses_the_request_priority():
+    async def scenario():
+        test_limiter = limiter(max_concurrency=2)
+        with request_priority(Priority.BACKGROUND):
+            async with test_limiter.aslot() as permit:
+                return permit.priority, test_limiter.stats()
+
+    priority, stats = asyncio.run(scenario())
+    assert priority == Priority.BACKGROUND
+    assert stats["inflight"] == 1 and stats["admitted"]["background"] == 1
+
+def test_rate_limited_calls_halve_the_concurrency_limit():
+    test_limiter = limiter(max_concurrency=8)
+    permit = test_limiter.acquire(Priority.BULK)
+    permit.rate_limited = True
+    test_limiter.release(permit)
+    assert test_limiter.limit == 4
+    assert test_limiter.stats()["rate_limited"] == 1
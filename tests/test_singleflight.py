@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+
+from services.deadline import remaining, request_deadline
+from services.singleflight import SingleFlight
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_ado_coalesces_concurrent_calls():
+    async def scenario():
+        flight = SingleFlight("test-ado")
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flight.ado("key", fetch) for _ in range(5)))
+        return results, calls, flight.stats()
+
+    results, calls, stats = run(scenario())
+    assert results == ["result"] * 5
+    assert calls == 1
+    assert stats["executions"] == 1 and stats["coalesced"] == 4 and stats["inflight"] == 0
+
+def test_ado_shares_the_error():
+    async def scenario():
+        flight = SingleFlight("test-ado-error")
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        return await asyncio.gather(flight.ado("key", fetch), flight.ado("key", fetch), return_exceptions=True)
+
+    first, second = run(scenario())
+    assert isinstance(first, ValueError) and second is first
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def scenario():
+        flight = SingleFlight("test-ado-cancel")
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "result"
+
+        leader = asyncio.ensure_future(flight.ado("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.ado("key", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower, leader.cancelled()
+
+    assert run(scenario()) == ("result", True)
+
+def test_shared_call_does_not_inherit_the_leaders_deadline():
+    async def scenario():
+        flight = SingleFlight("test-ado-deadline")
+        seen = []
+
+        async def fetch():
+            seen.append(remaining())
+            return "result"
+
+        with request_deadline(5):
+            result = await flight.ado("key", fetch)
+        return result, seen
+
+    assert run(scenario()) == ("result", [None])
+
+def test_astart_reports_the_leader():
+    async def scenario():
+        flight = SingleFlight("test-astart")
+        started = asyncio.Event()
+
+        async def fetch():
+            started.set()
+            await asyncio.sleep(0.01)
+            return "result"
+
+        first, first_leads = flight.astart("key", fetch)
+        second, second_leads = flight.astart("key", fetch)
+        await started.wait()
+        inflight = flight.inflight("key")
+        await first
+        return first is second, first_leads, second_leads, inflight is first, flight.inflight("key")
+
+    assert run(scenario()) == (True, True, False, True, None)
+
+def test_ado_many_fetches_only_keys_not_in_flight():
+    async def scenario():
+        flight = SingleFlight("test-ado-many")
+        batches = []
+
+        async def fetch_one():
+            await asyncio.sleep(0.02)
+            return "a!"
+
+        async def fetch_many(keys):
+            batches.append(sorted(keys))
+            await asyncio.sleep(0.01)
+            return {key: f"{key}!" for key in keys if key != "c"}
+
+        single = asyncio.ensure_future(flight.ado("a", fetch_one))
+        await asyncio.sleep(0)
+        results, errors = await flight.ado_many(["a", "b", "c", "b"], fetch_many)
+        return results, errors, batches, await single
+
+    results, errors, batches, single = run(scenario())
+    assert batches == [["b", "c"]]
+    assert results == {"a": "a!", "b": "b!"}
+    assert list(errors) == ["c"] and isinstance(errors["c"], KeyError)
+    assert single == "a!"
+
+def test_ado_many_shares_its_keys_with_ado():
+    async def scenario():
+        flight = SingleFlight("test-ado-many-share")
+        calls = []
+
+        async def fetch_many(keys):
+            calls.append("many")
+            await asyncio.sleep(0.02)
+            return {key: key.upper() for key in keys}
+
+        async def fetch_one():
+            calls.append("one")
+            return "never"
+
+        batch = asyncio.ensure_future(flight.ado_many(["x", "y"], fetch_many))
+        await asyncio.sleep(0)
+        single = await flight.ado("y", fetch_one)
+        return single, await batch, calls
+
+    single, (results, errors), calls = run(scenario())
+    assert single == "Y"
+    assert results == {"x": "X", "y": "Y"} and errors == {}
+    assert calls == ["many"]
+
+def test_ado_many_reports_a_cancelled_fetch_per_key():
+    async def scenario():
+        flight = SingleFlight("test-ado-many-cancel")
+        fetches = []
+
+        async def fetch_many(keys):
+            fetches.append(asyncio.current_task())
+            await asyncio.sleep(10)
+
+        batch = asyncio.ensure_future(flight.ado_many(["x", "y"], fetch_many))
+        while not fetches:
+            await asyncio.sleep(0)
+        fetches[0].cancel()
+        results, errors = await batch
+        return results, errors, flight.inflight("x")
+
+    results, errors, inflight = run(scenario())
+    assert results == {}
+    assert sorted(errors) == ["x", "y"]
+    assert all(isinstance(error, asyncio.CancelledError) for error in errors.values())
+    assert inflight is None
+
+def test_cancelled_ado_many_caller_leaves_the_fetch_running():
+    async def scenario():
+        flight = SingleFlight("test-ado-many-caller-cancel")
+        started = asyncio.Event()
+
+        async def fetch_many(keys):
+            started.set()
+            await asyncio.sleep(0.02)
+            return {key: key.upper() for key in keys}
+
+        async def fetch_one():
+            return "never"
+
+        batch = asyncio.ensure_future(flight.ado_many(["x"], fetch_many))
+        await started.wait()
+        follower = asyncio.ensure_future(flight.ado("x", fetch_one))
+        await asyncio.sleep(0)
+        batch.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await batch
+        return await follower
+
+    assert run(scenario()) == "X"
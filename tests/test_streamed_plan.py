@@ -0,0 +1,126 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from services import llm_client
+from services.llm_client import GeminiLLM, _StreamedPlan
+
+def day(number):
+    return {"day": f"Day {number}", "topic": f"topic {number}", "mini_challenge": "build it", "reasoning": "because", "resources": []}
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_replay_starts_with_the_days_so_far():
+    async def scenario():
+        stream = _StreamedPlan()
+        generation = asyncio.get_running_loop().create_future()
+        stream.publish(day(1))
+        stream.publish(day(2))
+        replayed = []
+
+        async def consume():
+            async for item in stream.replay(generation):
+                replayed.append(item)
+
+        consumer = asyncio.ensure_future(consume())
+        await asyncio.sleep(0)
+        assert replayed == [day(1), day(2)]
+        stream.publish(day(3))
+        stream.finish()
+        generation.set_result(None)
+        await consumer
+        replayed[0]["topic"] = "changed"
+        return replayed, stream.days[0]
+
+    replayed, first = run(scenario())
+    assert [item["day"] for item in replayed] == ["Day 1", "Day 2", "Day 3"]
+    assert first["topic"] == "topic 1"
+
+def test_replay_raises_the_generations_error():
+    async def scenario():
+        stream = _StreamedPlan()
+        generation = asyncio.get_running_loop().create_future()
+        stream.publish(day(1))
+        stream.finish()
+        generation.set_exception(RuntimeError("boom"))
+        replayed = []
+        with pytest.raises(RuntimeError, match="boom"):
+            async for item in stream.replay(generation):
+                replayed.append(item)
+        return replayed
+
+    assert run(scenario()) == [day(1)]
+
+class StreamingLLM(GeminiLLM):
+    """A GeminiLLM whose Gemini stream is scripted: one day per chunk, optionally failing part way."""
+
+    def __init__(self, fail_after=None):
+        self.model_name = "test-model"
+        self.fail_after = fail_after
+        self.calls = 0
+        self.chunks_sent = 0
+
+    def _json_config(self, schema):
+        return None
+
+    async def _agenerate_content(self, prompt, generation_config, stream=False):
+        self.calls += 1
+        text = json.dumps([day(number) for number in range(1, llm_client.PLAN_DAYS + 1)])
+        pieces = text.split("}, {")
+
+        async def chunks():
+            for index, piece in enumerate(pieces):
+                if self.fail_after is not None and index == self.fail_after:
+                    raise ConnectionError("stream broken")
+                await asyncio.sleep(0.005)
+                self.chunks_sent += 1
+                yield SimpleNamespace(text=piece + ("}, {" if index < len(pieces) - 1 else ""))
+
+        return chunks()
+
+async def collect(stream):
+    return [item async for item in stream]
+
+def test_concurrent_streams_share_one_generation():
+    async def scenario():
+        llm = StreamingLLM()
+        first = asyncio.ensure_future(collect(llm.astream_learning_plan("stream sharing topic")))
+        while llm.chunks_sent < 3:
+            await asyncio.sleep(0.001)
+        late = await collect(llm.astream_learning_plan("stream sharing topic"))
+        cached = await collect(llm.astream_learning_plan("stream sharing topic"))
+        return llm.calls, await first, late, cached
+
+    calls, first, late, cached = run(scenario())
+    expected = [f"Day {number}" for number in range(1, llm_client.PLAN_DAYS + 1)]
+    assert calls == 1
+    assert [item["day"] for item in first] == expected
+    assert [item["day"] for item in late] == expected
+    assert [item["day"] for item in cached] == expected
+
+def test_a_failed_stream_fails_every_listener_after_its_days():
+    async def scenario():
+        llm = StreamingLLM(fail_after=3)
+        outcomes = []
+
+        async def listen():
+            days = []
+            try:
+                async for item in llm.astream_learning_plan("stream failure topic"):
+                    days.append(item["day"])
+            except RuntimeError as e:
+                outcomes.append((days, str(e)))
+
+        await asyncio.gather(listen(), listen())
+        return llm.calls, outcomes, llm_client._plan_streams
+
+    calls, outcomes, streams = run(scenario())
+    assert calls == 1
+    assert len(outcomes) == 2
+    for days, error in outcomes:
+        assert days == ["Day 1", "Day 2", "Day 3"]
+        assert "stream broken" in error
+    assert streams == {}
@@ -0,0 +1,48 @@
+import pytest
+
+from services.topic_index import TopicIndex, canonical_tokens, stem
+
+def index_of(*topics, threshold=0.8):
+    index = TopicIndex(threshold=threshold)
+    for topic in topics:
+        index.add(topic)
+    return index
+
+def test_canonical_tokens_ignore_order_stop_words_and_inflection():
+    assert canonical_tokens("Python for data analysis") == canonical_tokens("data analysis with Python")
+    assert canonical_tokens("learning web frameworks") == ["framework", "learn", "web"]
+
+@pytest.mark.parametrize("topic", ["data analysis with Python", "python data analysis", "Python for Data Analysis"])
+def test_rephrased_topics_match(topic):
+    assert index_of("python for data analysis").match(topic) == "python for data analysis"
+
+@pytest.mark.parametrize("topic", ["data science in R", "python 2", "web development", "the and for"])
+def test_different_topics_do_not_match(topic):
+    assert index_of("data science", "python 3", "web design").match(topic) is None
+
+@pytest.mark.parametrize("word, stemmed", [
+    ("operators", "operator"), ("libraries", "library"), ("classes", "class"), ("indexes", "index"),
+    ("analyses", "analysis"), ("analysis", "analysis"), ("hypotheses", "hypothesis"), ("status", "status"),
+])
+def test_stem(word, stemmed):
+    assert stem(word) == stemmed
+
+def test_plurals_match():
+    assert index_of("kubernetes operator").match("kubernetes operators") == "kubernetes operator"
+    assert index_of("statistical analysis").match("statistical analyses") == "statistical analysis"
+
+def test_typos_do_not_match():
+    assert index_of("python").match("pyhton") is None
+
+def test_discarded_topics_no_longer_match():
+    index = index_of("rust ownership")
+    index.discard("rust ownership")
+    assert index.match("rust ownership") is None
+    assert len(index) == 0
+
+def test_oldest_topics_are_dropped_past_max_topics():
+    index = TopicIndex(max_topics=2)
+    for topic in ("go channels", "rust traits", "zig comptime"):
+        index.add(topic)
+    assert index.match("go channels") is None
+    assert index.match("zig comptime") == "zig comptime"